@@ -5,20 +5,29 @@ from .config import Config
 from .models import db
 from .models.models import Topic, Question, WikiPage
 from .routes import topic_bp, quiz_bp, api_bp, wiki_bp
-import os
+from .services import metrics
+from .services.cache import response_cache
+from .services.compression import compressor
+from .services.health import readiness
+from .services.json_provider import make_provider
+from .services.question_index import question_index
+from .services.replicas import replica_router
+from .services.slow_queries import slow_query_log
+from .services.wiki_search import wiki_search_index
 
 migrate = Migrate()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = make_provider(app)
     
     # Initialize extensions
 
     # Check if ALLOWED_ORIGINS environment variable exists
-    if os.getenv('ALLOWED_ORIGINS'):
+    if app.config.get('ALLOWED_ORIGINS'):
         # Get allowed origins from environment variable
-        allowed_origins = os.getenv('ALLOWED_ORIGINS').split(',')
+        allowed_origins = app.config['ALLOWED_ORIGINS']
         print(f"CORS allowing specific origins: {allowed_origins}")
         # Initialize CORS with specific origins
         CORS(app, origins=allowed_origins, supports_credentials=True)
@@ -29,6 +38,15 @@ def create_app(config_class=Config):
     
     db.init_app(app)
     migrate.init_app(app, db)
+    replica_router.init_app(app)
+    with app.app_context():
+        slow_query_log.init_app(app, db.engines)
+    question_index.init_app(app)
+    wiki_search_index.init_app(app)
+    response_cache.init_app(app)
+    metrics.init_app(app)
+    readiness.init_app(app)
+    compressor.init_app(app)
     
     # Register blueprints
     app.register_blueprint(topic_bp)
@@ -36,9 +54,16 @@ def create_app(config_class=Config):
     app.register_blueprint(wiki_bp)
     app.register_blueprint(api_bp)
     
-    # Health check route
+    # Liveness: the process answers, whatever its dependencies do
     @app.route('/health', methods=['GET'])
+    @app.route('/health/live', methods=['GET'])
     def health_check():
         return {"status": "healthy"}, 200
     
+    # Readiness: database, migrations, pool and load, see services/health.py
+    @app.route('/health/ready', methods=['GET'])
+    def readiness_check():
+        ready, checks = readiness.check()
+        return {"status": "ready" if ready else "unavailable", "checks": checks}, 200 if ready else 503
+    
     return app
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""ASGI application: async read endpoints in front of the Flask app.
+
+The hot read endpoints (topics, quizzes, wiki pages and categories) are
+served on the event loop with an async SQLAlchemy engine (asyncpg on
+Postgres, aiosqlite on SQLite), so a worker keeps serving other requests
+while it waits on the database. Everything else, including every write, is
+passed to the Flask app through a WSGI adapter and runs exactly as under
+gunicorn's sync workers.
+
+Requests are matched with Flask's own URL map, so routing, 404s and
+redirects are identical in both modes. The async views reuse the Core
+statements of ``services/reads.py`` and the sync helpers around them
+(question index, validators, quiz tokens, compression) by running them on
+the sync side of an async connection with ``AsyncConnection.run_sync``, and
+return byte-identical bodies. They skip the response cache (its backends
+are blocking) and always read the primary, not the replicas.
+"""
+import time
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header, parse_date, parse_etags
+from werkzeug.routing import RequestRedirect
+
+from . import create_app
+from .config import Config, async_database_url, async_engine_options
+from .routes.quiz_routes import MAX_QUIZ_QUESTIONS, quiz_payload
+from .services import metrics, reads
+from .services.compression import compressor
+from .services.conditional import add_validators, is_fresh, row_validators, table_validators
+from .services.question_index import question_index
+from .services.sampling import sample_questions
+from .services.wiki_render import rendered
+
+WSGI_THREADS = 10
+
+
+def create_async_read_engine(config):
+    """Async engine for ``config``, by default on ``SQLALCHEMY_DATABASE_URI``.
+
+    Raises ``ValueError`` for a database with no async driver, only here, so
+    the WSGI app runs on any database.
+    """
+    uri = config.get('ASYNC_DATABASE_URI') or async_database_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = config.get('ASYNC_ENGINE_OPTIONS')
+    if options is None:
+        options = async_engine_options(uri)
+    return create_async_engine(uri, **options)
+
+
+class ReadRequest:
+    """The parts of an ASGI request the async views need."""
+
+    def __init__(self, scope, view_args):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope['query_string']
+        # A MultiDict like Flask's request.args: a repeated key reads its first value
+        self.args = MultiDict(parse_qsl(self.query_string.decode('latin-1'), keep_blank_values=True))
+        self.headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        self.view_args = view_args
+
+    def is_fresh(self, etag, last_modified):
+        if_modified_since = parse_date(self.headers.get('if-modified-since'))
+        if_none_match = parse_etags(self.headers.get('if-none-match'))
+        return is_fresh(if_none_match, if_modified_since, etag, last_modified)
+
+
+async def get_topics(app, conn, request):
+    etag, last_modified = await conn.run_sync(
+        lambda bind: table_validators('topics', bind=bind, query_string=request.query_string)
+    )
+    if request.is_fresh(etag, last_modified):
+        return app.not_modified(etag, last_modified)
+    topics = await conn.run_sync(reads.read_topics)
+    return app.json_response(request, topics, etag, last_modified)
+
+
+async def get_quiz(app, conn, request):
+    topic_slug = request.view_args['topic_slug']
+    topic = await conn.run_sync(lambda bind: question_index.get(topic_slug, bind))
+    if topic is None:
+        # Flask renders the 404
+        return None
+    selected_questions = await conn.run_sync(
+        lambda bind: sample_questions(topic.question_ids, MAX_QUIZ_QUESTIONS, bind)
+    )
+    with app.flask_app.app_context():
+        payload = quiz_payload(topic_slug, topic, selected_questions)
+    return app.json_response(request, payload)
+
+
+async def get_all_wiki_pages(app, conn, request):
+    if any(arg in request.args for arg in ('fields', 'limit', 'cursor')):
+        # The keyset-paginated listing stays on Flask
+        return None
+    etag, last_modified = await conn.run_sync(
+        lambda bind: table_validators('wiki_pages', bind=bind, query_string=request.query_string)
+    )
+    if request.is_fresh(etag, last_modified):
+        return app.not_modified(etag, last_modified)
+
+    category = request.args.get('category')
+    pages = await conn.run_sync(lambda bind: reads.read_wiki_pages(category, bind))
+    if not pages:
+        message = f"No wiki pages found in category: {category}" if category else "No wiki pages found"
+        return app.json_response(request, {'message': message, 'pages': []}, etag, last_modified)
+    return app.json_response(request, pages, etag, last_modified)
+
+
+async def get_wiki_page(app, conn, request):
+    slug = request.view_args['slug']
+    version = await conn.run_sync(lambda bind: reads.read_wiki_version(slug, bind))
+    if version is None:
+        return None
+    etag, last_modified = row_validators('wiki', version.id, version.updated_at, request.query_string)
+    if request.is_fresh(etag, last_modified):
+        return app.not_modified(etag, last_modified)
+
+    page = await conn.run_sync(lambda bind: reads.read_wiki_page(slug, bind))
+    if page is None:
+        # Deleted since the version check; Flask renders the 404
+        return None
+    result = reads.page_dict(page)
+    if request.args.get('format') == 'html':
+        del result['content']
+        result.update(rendered(page))
+    return app.json_response(request, result, etag, last_modified)
+
+
+async def get_categories(app, conn, request):
+    etag, last_modified = await conn.run_sync(
+        lambda bind: table_validators('wiki_pages', bind=bind, query_string=request.query_string)
+    )
+    if request.is_fresh(etag, last_modified):
+        return app.not_modified(etag, last_modified)
+    categories = await conn.run_sync(reads.read_categories)
+    return app.json_response(request, categories, etag, last_modified)
+
+
+# Flask endpoint -> async view serving its GET requests
+ASYNC_VIEWS = {
+    'topics.get_topics': get_topics,
+    'quizzes.get_quiz': get_quiz,
+    'wiki.get_all_wiki_pages': get_all_wiki_pages,
+    'wiki.get_wiki_page': get_wiki_page,
+    'wiki.get_categories': get_categories,
+}
+
+
+class AsyncReadApp:
+    """ASGI app serving ``ASYNC_VIEWS`` itself and the rest through Flask.
+
+    An async view returns None to leave the request to its Flask view.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+        self.urls = flask_app.url_map.bind('localhost')
+        self.engine = create_async_read_engine(flask_app.config)
+        self.allowed_origins = flask_app.config.get('ALLOWED_ORIGINS')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        match = self.match(scope)
+        if match is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        rule, view_args = match
+        request = ReadRequest(scope, view_args)
+        # Same labels as the Flask views, so both modes share their series
+        labels = (request.method, rule.endpoint.rpartition('.')[0], rule.rule)
+        started = time.perf_counter()
+        metrics.IN_FLIGHT.inc()
+        try:
+            async with self.engine.connect() as conn:
+                response = await ASYNC_VIEWS[rule.endpoint](self, conn, request)
+            if response is not None:
+                await self.send(request, response, send)
+        except Exception:
+            metrics.REQUEST_DURATION.labels(*labels, '500').observe(time.perf_counter() - started)
+            raise
+        finally:
+            metrics.IN_FLIGHT.dec()
+
+        if response is None:
+            # Left to Flask, which records its own metrics
+            await self.wsgi(scope, receive, send)
+            return
+        metrics.REQUEST_DURATION.labels(*labels, str(response.status_code)).observe(time.perf_counter() - started)
+        metrics.RESPONSE_SIZE.labels(*labels).observe(response.content_length or 0)
+
+    def match(self, scope):
+        """``(rule, view_args)`` when an async view serves this request, else None."""
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        try:
+            rule, view_args = self.urls.match(scope['path'], method='GET', return_rule=True)
+        except (HTTPException, RequestRedirect):
+            return None
+        if rule.endpoint not in ASYNC_VIEWS:
+            return None
+        return rule, view_args
+
+    def json_response(self, request, payload, etag=None, last_modified=None):
+        response = self.flask_app.json.response(payload)
+        if etag:
+            add_validators(response, etag, last_modified)
+        return compressor.compress_response(
+            response, request.path, parse_accept_header(request.headers.get('accept-encoding'))
+        )
+
+    def not_modified(self, etag, last_modified):
+        return add_validators(self.flask_app.response_class(status=304), etag, last_modified)
+
+    def cors_headers(self, request):
+        """The headers Flask-CORS would add (see ``create_app``)."""
+        origin = request.headers.get('origin')
+        if not self.allowed_origins:
+            if origin is None:
+                return [('Access-Control-Allow-Origin', '*')]
+            return [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')]
+        if origin not in self.allowed_origins:
+            return []
+        return [('Access-Control-Allow-Origin', origin), ('Access-Control-Allow-Credentials', 'true')]
+
+    async def send(self, request, response, send):
+        headers = list(response.headers.items()) + self.cors_headers(request)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config_class=Config):
+    return AsyncReadApp(create_app(config_class))
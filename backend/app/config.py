@@ -3,8 +3,139 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def engine_options(uri, name='primary'):
+    """SQLALCHEMY_ENGINE_OPTIONS from the DB_* environment variables.
+
+    With DB_PGBOUNCER=1 the app keeps no pool of its own (PgBouncer in
+    transaction mode does the pooling); psycopg2 never uses server-side
+    prepared statements, so nothing else needs turning off.
+    """
+    from app.services.pool_metrics import MeteredNullPool, MeteredQueuePool
+
+    if uri.startswith('sqlite'):
+        # In-memory databases need Flask-SQLAlchemy's StaticPool
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {'poolclass': MeteredNullPool, 'pool_logging_name': name}
+
+    options = {
+        'pool_logging_name': name,
+        'pool_pre_ping': bool(int(os.getenv('DB_POOL_PRE_PING', '1'))),
+        'connect_args': {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10'))}
+    }
+    if bool(int(os.getenv('DB_PGBOUNCER', '0'))):
+        options['poolclass'] = MeteredNullPool
+        # Connections are not reused, so there is nothing to ping
+        options['pool_pre_ping'] = False
+        return options
+    options.update({
+        'poolclass': MeteredQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        # Close connections before RDS or a load balancer drops them idle
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        # Reuse the most recent connection so idle extras age out after a spike
+        'pool_use_lifo': True
+    })
+    return options
+
+
+def async_database_url(uri):
+    """``uri`` with the async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    scheme, _, rest = uri.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect == 'postgres':
+        dialect = 'postgresql'
+    driver = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}.get(dialect)
+    if driver is None:
+        raise ValueError(f"No async driver for {scheme}")
+    url = f'{dialect}+{driver}://{rest}'
+    if driver == 'asyncpg' and bool(int(os.getenv('DB_PGBOUNCER', '0'))):
+        # PgBouncer in transaction mode cannot keep prepared statements around
+        url += ('&' if '?' in url else '?') + 'prepared_statement_cache_size=0'
+    return url
+
+
+def async_engine_options(uri):
+    """Engine options for the async engine of the ASGI app (``app/asgi.py``).
+
+    Same DB_* variables as ``engine_options``; async engines need an
+    asyncio-aware pool, so pool metrics are not collected for them.
+    """
+    from sqlalchemy.pool import NullPool
+
+    if uri.startswith('sqlite'):
+        return {'poolclass': NullPool}
+
+    options = {
+        'pool_pre_ping': bool(int(os.getenv('DB_POOL_PRE_PING', '1'))),
+        'connect_args': {'timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10'))}
+    }
+    if bool(int(os.getenv('DB_PGBOUNCER', '0'))):
+        options.update({'poolclass': NullPool, 'pool_pre_ping': False})
+        options['connect_args']['statement_cache_size'] = 0
+        return options
+    options.update({
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_use_lifo': True
+    })
+    return options
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries for the comma-separated replica URLs."""
+    binds = {}
+    for index, url in enumerate(u.strip() for u in urls.split(',') if u.strip()):
+        name = f'replica_{index}'
+        binds[name] = dict(engine_options(url, name), url=url)
+    return binds
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
+    # Comma-separated CORS origins; unset allows all (development mode)
+    ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS').split(',') if os.getenv('ALLOWED_ORIGINS') else None
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/devops_learning')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Read replicas used by GET requests, see services/replicas.py
+    SQLALCHEMY_BINDS = replica_binds(os.getenv('DATABASE_URL_READ', ''))
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '5.0'))
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '1.0'))
+    # Async engine of the ASGI app (asgi.py); reads the primary only. Derived
+    # from SQLALCHEMY_DATABASE_URI when the ASGI app starts if left unset
+    ASYNC_DATABASE_URI = os.getenv('ASYNC_DATABASE_URL') or None
+    ASYNC_ENGINE_OPTIONS = None
     DEBUG = bool(int(os.getenv('FLASK_DEBUG', '0')))
+    QUESTION_INDEX_CHECK_INTERVAL = float(os.getenv('QUESTION_INDEX_CHECK_INTERVAL', '1.0'))
+    QUIZ_TOKEN_MAX_AGE = int(os.getenv('QUIZ_TOKEN_MAX_AGE', '86400'))
+    BULK_UPLOAD_BATCH_SIZE = int(os.getenv('BULK_UPLOAD_BATCH_SIZE', '1000'))
+    DUPLICATE_QUESTION_POLICY = os.getenv('DUPLICATE_QUESTION_POLICY', 'reject')
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.7'))
+    WIKI_SEARCH_CHECK_INTERVAL = float(os.getenv('WIKI_SEARCH_CHECK_INTERVAL', '1.0'))
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+    COMPRESS_CACHE_SIZE = int(os.getenv('COMPRESS_CACHE_SIZE', '256'))
+    COMPRESS_CACHE_MAX_BYTES = int(os.getenv('COMPRESS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+    # Seconds; 0 turns the slow-query log off
+    SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', '0'))
+    SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', '200'))
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', '0.1'))
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    # /health/ready, see services/health.py
+    READINESS_CHECK_INTERVAL = float(os.getenv('READINESS_CHECK_INTERVAL', '2.0'))
+    READINESS_MAX_POOL_SATURATION = float(os.getenv('READINESS_MAX_POOL_SATURATION', '0.9'))
+    READINESS_MAX_IN_FLIGHT = int(os.getenv('READINESS_MAX_IN_FLIGHT', '0'))
+    # Response cache for read endpoints: none, memory or redis
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'none')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+    CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+    CACHE_SIZE = int(os.getenv('CACHE_SIZE', '1024'))
+    CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'devopsdojo:cache:')
@@ -1,9 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from app.services.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Import models here
-from .models import Topic, Question, WikiPage
+from .models import Topic, Question, QuestionBucket, WikiPage, TableVersion, IngestCheckpoint
 
 # Make models available at package level
-__all__ = ['db', 'Topic', 'Question', 'WikiPage']
\ No newline at end of file
+__all__ = ['db', 'Topic', 'Question', 'QuestionBucket', 'WikiPage', 'TableVersion', 'IngestCheckpoint']
\ No newline at end of file
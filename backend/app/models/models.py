@@ -1,5 +1,6 @@
 from datetime import datetime
 from . import db
+from app.services.fingerprints import content_hash
 import random
 
 class Topic(db.Model):
@@ -19,35 +20,47 @@ class Topic(db.Model):
             'description': self.description
         }
 
+def shuffle_options(options, correct_answer):
+    """Shuffle options and adjust correct answer index accordingly"""
+    options_with_indices = list(enumerate(options))
+    random.shuffle(options_with_indices)
+    
+    new_options = []
+    order = []
+    new_correct_index = None
+    
+    for new_index, (original_index, option) in enumerate(options_with_indices):
+        new_options.append(option)
+        order.append(original_index)
+        if original_index == correct_answer:
+            new_correct_index = new_index
+    
+    return {
+        'options': new_options,
+        'order': order,
+        'correct_answer': new_correct_index
+    }
+
+def _question_content_hash(context):
+    return content_hash(context.get_current_parameters()['question_text'])
+
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_topic_id_content_hash', 'topic_id', 'content_hash'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False, index=True)
     question_text = db.Column(db.Text, nullable=False)
     options = db.Column(db.JSON, nullable=False)
     correct_answer = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(40), nullable=True, default=_question_content_hash)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def shuffle_options(self):
         """Shuffle options and adjust correct answer index accordingly"""
-        correct_option = self.options[self.correct_answer]
-        
-        options_with_indices = list(enumerate(self.options))
-        random.shuffle(options_with_indices)
-        
-        new_options = []
-        new_correct_index = None
-        
-        for new_index, (_, option) in enumerate(options_with_indices):
-            new_options.append(option)
-            if option == correct_option:
-                new_correct_index = new_index
-        
-        return {
-            'options': new_options,
-            'correct_answer': new_correct_index
-        }
+        return shuffle_options(self.options, self.correct_answer)
 
     def to_dict(self, shuffle=True):
         if shuffle:
@@ -65,18 +78,39 @@ class Question(db.Model):
             'correct_answer': self.correct_answer
         }
 
+class QuestionBucket(db.Model):
+    """MinHash/LSH band bucket of a question, used to find near-duplicates"""
+    __tablename__ = 'question_buckets'
+    __table_args__ = (
+        db.Index('ix_question_buckets_lookup', 'topic_id', 'band', 'bucket'),
+    )
+
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    band = db.Column(db.SmallInteger, primary_key=True)
+    topic_id = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
 class WikiPage(db.Model):
     __tablename__ = 'wiki_pages'
+    __table_args__ = (
+        db.Index('ix_wiki_pages_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     slug = db.Column(db.String(100), unique=True, nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(100), nullable=False)  # e.g., "roadmap", "links", "guides"
+    category = db.Column(db.String(100), nullable=False, index=True)  # e.g., "roadmap", "links", "guides"
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author = db.Column(db.String(100), nullable=True)
     is_published = db.Column(db.Boolean, default=True)
+    # Rendered HTML and table of contents of `content`, see services/wiki_render.py
+    content_html = db.Column(db.Text, nullable=True)
+    toc = db.Column(db.JSON, nullable=True)
+    rendered_hash = db.Column(db.String(40), nullable=True)
+    # Heading index of `content`, see services/wiki_sections.py
+    sections = db.Column(db.JSON, nullable=True)
     
     def to_dict(self):
         return {
@@ -85,8 +119,26 @@ class WikiPage(db.Model):
             'title': self.title,
             'content': self.content,
             'category': self.category,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'author': self.author,
             'is_published': self.is_published
-        }
\ No newline at end of file
+        }
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the same transaction as the write"""
+    __tablename__ = 'table_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IngestCheckpoint(db.Model):
+    """Chunk of a CSV load committed by bulk_upload_questions.py"""
+    __tablename__ = 'ingest_checkpoints'
+
+    source = db.Column(db.String(100), primary_key=True)  # "<sha1 of file>:<chunk size>"
+    chunk = db.Column(db.Integer, primary_key=True)
+    rows = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,4 +1,9 @@
-from flask import Blueprint, jsonify
+import hmac
+from flask import Blueprint, current_app, jsonify, request
+from app.models import db
+from app.services.pool_metrics import pool_snapshot
+from app.services.replicas import replica_router
+from app.services.slow_queries import slow_query_log
 
 # Create blueprints
 topic_bp = Blueprint('topics', __name__, url_prefix='/api/topics')
@@ -12,5 +17,33 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 def api_health_check():
     return jsonify({"status": "healthy", "message": "API is operational"}), 200
 
+@api_bp.route('/pool', methods=['GET'])
+def pool_status():
+    """Database connection pool usage, for dashboards and autoscaling"""
+    result = pool_snapshot(db.engine)
+    replicas = sorted(name for name in db.engines if name)
+    if replicas:
+        status = replica_router.status()
+        result['replicas'] = {
+            name: dict(pool_snapshot(db.engines[name]), **status.get(name, {})) for name in replicas
+        }
+    return jsonify(result), 200
+
+@api_bp.route('/admin/slow-queries', methods=['GET', 'DELETE'])
+def slow_queries():
+    """Recorded slow SQL statements, newest first; DELETE clears them"""
+    token = current_app.config['ADMIN_TOKEN']
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not token or not hmac.compare_digest(supplied, token):
+        return jsonify({'error': 'Admin token required'}), 403
+    
+    if request.method == 'DELETE':
+        slow_query_log.clear()
+        return '', 204
+    return jsonify({
+        'threshold_seconds': slow_query_log.threshold,
+        'queries': slow_query_log.snapshot()
+    }), 200
+
 # Import routes after creating blueprints
 from . import topic_routes, quiz_routes, wiki_routes
\ No newline at end of file
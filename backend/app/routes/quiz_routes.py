@@ -1,65 +1,80 @@
-from flask import jsonify, request
-from app.models.models import Topic, Question
+from flask import abort, current_app, jsonify, request, stream_with_context
+from app.models.models import Topic, Question, shuffle_options
 from app.models import db
+from app.services.bulk_ingest import (
+    QuestionIngest, default_topic_fields, iter_lines, iter_csv_rows, iter_ndjson_rows
+)
+from app.services.conditional import add_validators, not_modified, table_validators
+from app.services.duplicates import find_clusters
+from app.services.export import export_csv, export_ndjson, page_questions, stream_all_questions
+from app.services.question_index import question_index
+from app.services.quiz_tokens import InvalidQuizToken, issue_token, read_token, grade
+from app.services.sampling import sample_questions
 from . import quiz_bp
-import random
-import string
 
 MAX_QUIZ_QUESTIONS = 15
 
+STREAMING_UPLOAD_TYPES = ('application/x-ndjson', 'text/csv')
+
+QUESTIONS_PAGE_SIZE = 100
+QUESTIONS_MAX_PAGE_SIZE = 1000
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
 @quiz_bp.route('/<topic_slug>', methods=['GET'])
 def get_quiz(topic_slug):
-    topic = Topic.query.filter_by(slug=topic_slug).first_or_404()
-    
-    # Get all questions for the topic
-    all_questions = Question.query.filter_by(topic_id=topic.id).all()
+    topic = question_index.get(topic_slug)
+    if topic is None:
+        abort(404)
     
-    if not all_questions:
-        return jsonify({
-            'title': topic.name,
-            'questions': [],
-            'total_questions': 0,
-            'selected_questions': 0
+    # Pick question IDs from the index and only load the selected rows
+    selected_questions = sample_questions(topic.question_ids, MAX_QUIZ_QUESTIONS)
+    return jsonify(quiz_payload(topic_slug, topic, selected_questions))
+
+def quiz_payload(topic_slug, topic, selected_questions):
+    """Quiz response for the sampled questions, with its signed token"""
+    # Shuffle options server-side; the token records the order we served
+    questions = []
+    served = []
+    for question in selected_questions:
+        shuffled = shuffle_options(question.options, question.correct_answer)
+        questions.append({
+            'id': question.id,
+            'question': question.question_text,
+            'options': shuffled['options']
         })
+        served.append((question.id, shuffled['order'], shuffled['correct_answer']))
     
-    # Shuffle and limit questions
-    selected_questions = random.sample(
-        all_questions, 
-        min(MAX_QUIZ_QUESTIONS, len(all_questions))
-    )
-    
-    return jsonify({
+    return {
         'title': topic.name,
-        'questions': [q.to_dict(shuffle=False) for q in selected_questions],
-        'total_questions': len(all_questions),
-        'selected_questions': len(selected_questions)
-    })
+        'questions': questions,
+        'total_questions': len(topic.question_ids),
+        'selected_questions': len(selected_questions),
+        'token': issue_token(topic_slug, served)
+    }
 
 @quiz_bp.route('/submit', methods=['POST'])
 def submit_quiz():
     data = request.get_json()
     topic_slug = data.get('topic')
     answers = data.get('answers')
+    token = data.get('token')
     
     if not topic_slug or not answers:
         return jsonify({'error': 'Invalid submission'}), 400
-        
-    topic = Topic.query.filter_by(slug=topic_slug).first()
-    if not topic:
-        return jsonify({'error': 'Topic not found'}), 404
+    if not token:
+        return jsonify({'error': 'Missing quiz token'}), 400
     
-    # Get all questions that were answered
-    question_ids = [int(qid) for qid in answers.keys()]
-    questions = Question.query.filter(Question.id.in_(question_ids)).all()
+    # Grade from the signed token; no database round trip needed
+    try:
+        payload = read_token(token)
+    except InvalidQuizToken:
+        return jsonify({'error': 'Invalid or expired quiz token'}), 400
     
-    correct_count = 0
-    total_questions = len(questions)
-    
-    for question in questions:
-        submitted_answer = answers.get(str(question.id))
-        if submitted_answer == question.correct_answer:
-            correct_count += 1
+    if payload['s'] != topic_slug:
+        return jsonify({'error': 'Quiz token does not match topic'}), 400
     
+    correct_count, total_questions = grade(payload, answers)
     score = (correct_count / total_questions * 100) if total_questions > 0 else 0
     
     return jsonify({
@@ -81,12 +96,7 @@ def manage_questions():
         topic = Topic.query.filter_by(slug=data['topic_slug']).first()
         if not topic:
             # Create a new topic with default values based on slug
-            topic_name = data['topic_slug'].replace('-', ' ').title()
-            topic = Topic(
-                name=topic_name,
-                description=f"Questions about {topic_name}",
-                slug=data['topic_slug']
-            )
+            topic = Topic(**default_topic_fields(data['topic_slug']))
             db.session.add(topic)
             db.session.commit()
             
@@ -107,144 +117,109 @@ def manage_questions():
             print(f"Error adding question: {str(e)}")
             return jsonify({'error': str(e)}), 400
             
-    questions = Question.query.all()
-    return jsonify([q.to_dict(shuffle=False) for q in questions])
+    tables = ('questions', 'topics') if 'topic' in request.args else ('questions',)
+    # Filtering by topic resolves its slug, so a topic rename changes the response
+    etag, last_modified = table_validators(*tables)
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    if any(arg in request.args for arg in ('after_id', 'limit', 'topic')):
+        limit = min(max(request.args.get('limit', QUESTIONS_PAGE_SIZE, type=int), 1), QUESTIONS_MAX_PAGE_SIZE)
+        questions, next_after_id = page_questions(
+            request.args.get('after_id', 0, type=int), limit, request.args.get('topic')
+        )
+        response = jsonify({'questions': questions, 'next_after_id': next_after_id})
+        return add_validators(response, etag, last_modified)
+    
+    # Streamed, so the whole bank is never held in memory at once
+    response = current_app.response_class(stream_with_context(stream_all_questions()), mimetype='application/json')
+    return add_validators(response, etag, last_modified)
+
+@quiz_bp.route('/questions/export', methods=['GET'])
+def export_questions():
+    """Stream the whole question bank as NDJSON or CSV"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    topic_slug = request.args.get('topic')
+    if export_format == 'csv':
+        rows = export_csv(topic_slug)
+    else:
+        rows = export_ndjson(topic_slug)
+    
+    response = current_app.response_class(stream_with_context(rows), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=questions.{export_format}'
+    return response
+
+def new_ingest(**kwargs):
+    return QuestionIngest(
+        db.session,
+        duplicate_policy=current_app.config['DUPLICATE_QUESTION_POLICY'],
+        near_threshold=current_app.config['NEAR_DUPLICATE_THRESHOLD'],
+        **kwargs
+    )
 
 @quiz_bp.route('/questions/bulk', methods=['POST'])
 def bulk_upload_questions():
+    if request.mimetype in STREAMING_UPLOAD_TYPES:
+        return stream_upload_questions()
     if not request.is_json:
-        return jsonify({'error': 'Content-Type must be application/json'}), 400
+        return jsonify({'error': 'Content-Type must be application/json, application/x-ndjson or text/csv'}), 400
         
     questions_data = request.get_json()
     if not isinstance(questions_data, list):
         return jsonify({'error': 'Expected a list of questions'}), 400
-        
-    success_count = 0
-    failed_count = 0
-    errors = []
-    valid_questions = []
-    created_topics = []
     
-    # First pass: Validate all questions and create topics if needed
+    # Validate every row first, then write topics and questions set-based
+    ingest = new_ingest()
     for index, question_data in enumerate(questions_data):
-        try:
-            # Skip empty rows
-            if not question_data or not any(question_data.values()):
-                continue
-
-            # Validate required fields
-            if not all(k in question_data for k in ('topic_slug', 'question_text', 'options', 'correct_answer')):
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Missing required fields")
-                continue
-
-            # Validate content
-            if not question_data['question_text'] or not question_data['question_text'].strip():
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Empty question text")
-                continue
-
-            # Validate options
-            if not isinstance(question_data['options'], list) or len(question_data['options']) != 4:
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Invalid options format")
-                continue
-
-            if any(opt is None or str(opt).strip() == '' for opt in question_data['options']):
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Empty options not allowed")
-                continue
-
-            # Validate correct_answer
-            try:
-                correct_answer = int(question_data['correct_answer'])
-                if not 0 <= correct_answer <= 3:
-                    raise ValueError("Correct answer must be between 0 and 3")
-                question_data['correct_answer'] = correct_answer
-            except (ValueError, TypeError):
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Invalid correct_answer value")
-                continue
-
-            # Find or create topic
-            topic_slug = question_data['topic_slug'].strip()
-            topic = Topic.query.filter_by(slug=topic_slug).first()
-            
-            if not topic:
-                # Track which topics we've created during this operation
-                if topic_slug not in created_topics:
-                    # Generate a nice title from the slug
-                    topic_name = topic_slug.replace('-', ' ').title()
-                    
-                    # Create new topic
-                    topic = Topic(
-                        name=topic_name,
-                        description=f"Questions about {topic_name}",
-                        slug=topic_slug
-                    )
-                    db.session.add(topic)
-                    created_topics.append(topic_slug)
-                    print(f"Created new topic: {topic_name} ({topic_slug})")
-                else:
-                    # We've created this topic during this batch, but it's not committed yet
-                    topic = Topic.query.filter_by(slug=topic_slug).first()
+        ingest.add(index + 1, question_data)
+    
+    try:
+        ingest.flush()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Failed to commit questions to database',
+            'detail': str(e),
+            'errors': ingest.errors
+        }), 400
+    
+    return jsonify(ingest.summary())
 
-            # If all validations pass, add to valid questions
-            valid_questions.append({
-                'topic_id': topic.id if topic.id else None,  # Will be set after commit
-                'topic_slug': topic_slug,  # Keep track of slug for topics created in this batch
-                'question_text': question_data['question_text'].strip(),
-                'options': [str(opt).strip() for opt in question_data['options']],
-                'correct_answer': correct_answer
-            })
-            
-        except Exception as e:
-            failed_count += 1
-            errors.append(f"Row {index + 1}: {str(e)}")
-            continue
+def stream_upload_questions():
+    """Ingest an NDJSON or CSV body row by row, committing fixed-size batches"""
+    batch_size = current_app.config['BULK_UPLOAD_BATCH_SIZE']
+    lines = iter_lines(request.stream)
+    if request.mimetype == 'text/csv':
+        rows = iter_csv_rows(lines)
+    else:
+        rows = iter_ndjson_rows(lines)
     
-    # Commit new topics first if any were created
-    if created_topics:
-        try:
-            db.session.commit()
-            print(f"Successfully created {len(created_topics)} new topics")
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({
-                'error': 'Failed to create new topics',
-                'detail': str(e),
-                'errors': errors
-            }), 400
-    
-    # Second pass: Add valid questions to database
-    if valid_questions:
-        try:
-            for question_data in valid_questions:
-                # If we were tracking by slug for new topics, get the actual topic id now
-                if question_data['topic_id'] is None:
-                    topic = Topic.query.filter_by(slug=question_data['topic_slug']).first()
-                    question_data['topic_id'] = topic.id
-                
-                # Remove the temporary slug field
-                if 'topic_slug' in question_data:
-                    question_data.pop('topic_slug')
-                
-                question = Question(**question_data)
-                db.session.add(question)
-                success_count += 1
-            
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({
-                'error': 'Failed to commit questions to database',
-                'detail': str(e),
-                'errors': errors
-            }), 400
+    ingest = new_ingest(batch_size=batch_size)
+    for row_number, question_data in rows:
+        ingest.add(row_number, question_data)
+        if ingest.pending >= batch_size:
+            ingest.commit_batch()
+    ingest.commit_batch()
     
+    summary = ingest.summary()
+    summary.update({
+        'rows_read': ingest.rows_read,
+        'batches_committed': ingest.batches
+    })
+    return jsonify(summary)
+
+@quiz_bp.route('/duplicates/<topic_slug>', methods=['GET'])
+def get_duplicate_questions(topic_slug):
+    """List clusters of exact and near-duplicate questions in a topic"""
+    topic = Topic.query.filter_by(slug=topic_slug).first_or_404()
+    clusters = find_clusters(db.session, topic.id, current_app.config['NEAR_DUPLICATE_THRESHOLD'])
     return jsonify({
-        'success': success_count,
-        'failed': failed_count,
-        'topics_created': len(created_topics),
-        'errors': errors if errors else None
-    })
\ No newline at end of file
+        'topic': topic.slug,
+        'exact': clusters['exact'],
+        'near': clusters['near']
+    })
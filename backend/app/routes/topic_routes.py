@@ -1,12 +1,20 @@
 from flask import jsonify, request
 from app.models.models import Topic
 from app.models import db
+from app.services.cache import cached
+from app.services.conditional import add_validators, not_modified, table_validators
+from app.services.reads import read_topics
 from . import topic_bp
 
 @topic_bp.route('', methods=['GET'])
+@cached('topics')
 def get_topics():
-    topics = Topic.query.all()
-    return jsonify([topic.to_dict() for topic in topics])
+    etag, last_modified = table_validators('topics')
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    return add_validators(jsonify(read_topics()), etag, last_modified)
 
 @topic_bp.route('', methods=['POST'])
 def create_topic():
@@ -1,19 +1,51 @@
-from flask import jsonify, request
+from flask import abort, jsonify, request
 from app.models.models import WikiPage
 from app.models import db
 from slugify import slugify
+from app.services.cache import cached
+from app.services.conditional import add_validators, not_modified, row_validators, table_validators
+from app.services.reads import page_dict, read_categories, read_wiki_page, read_wiki_pages, read_wiki_version
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.services.wiki_render import render_cache, rendered
+from app.services.wiki_sections import page_sections, public_section
+from app.services.wiki_search import search_pages
+from sqlalchemy import and_, func, or_, select
 from . import wiki_bp
 from datetime import datetime
 
+# Columns the lightweight listing may return; content is never loaded there
+LISTING_FIELDS = ('id', 'slug', 'title', 'category', 'created_at', 'updated_at', 'author', 'is_published')
+DEFAULT_LISTING_FIELDS = ('id', 'slug', 'title', 'category', 'updated_at')
+LISTING_LIMIT = 50
+LISTING_MAX_LIMIT = 200
+
+SEARCH_PER_PAGE = 20
+SEARCH_MAX_PER_PAGE = 100
+
 @wiki_bp.route('', methods=['GET'])
 def get_all_wiki_pages():
     """Get all wiki pages or filter by category"""
     category = request.args.get('category')
     
+    etag, last_modified = table_validators('wiki_pages')
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    if any(arg in request.args for arg in ('fields', 'limit', 'cursor')):
+        response = list_wiki_pages(category)
+    else:
+        response = list_all_wiki_pages(category)
+    if isinstance(response, tuple):
+        return response
+    return add_validators(response, etag, last_modified)
+
+def list_all_wiki_pages(category):
+    """Full listing including content"""
     try:
         if category:
             print(f"Filtering wiki pages by category: {category}")
-            pages = WikiPage.query.filter_by(category=category).all()
+            pages = read_wiki_pages(category)
             if not pages:
                 print(f"No wiki pages found in category: {category}")
                 return jsonify({
@@ -22,7 +54,7 @@ def get_all_wiki_pages():
                 })
         else:
             print("Retrieving all wiki pages")
-            pages = WikiPage.query.all()
+            pages = read_wiki_pages()
             if not pages:
                 print("No wiki pages found")
                 return jsonify({
@@ -30,25 +62,154 @@ def get_all_wiki_pages():
                     "pages": []
                 })
         
-        result = [page.to_dict() for page in pages]
-        print(f"Returning {len(result)} wiki pages")
-        return jsonify(result)
+        print(f"Returning {len(pages)} wiki pages")
+        return jsonify(pages)
     
     except Exception as e:
         print(f"Error retrieving wiki pages: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def list_wiki_pages(category):
+    """Lightweight listing without content, newest first, keyset-paginated"""
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(DEFAULT_LISTING_FIELDS)
+    unknown = [f for f in fields if f not in LISTING_FIELDS]
+    if unknown:
+        return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+    
+    limit = min(max(request.args.get('limit', LISTING_LIMIT, type=int), 1), LISTING_MAX_LIMIT)
+    table = WikiPage.__table__
+    # The sort key is always selected so the next cursor can be built
+    columns = [table.c[f] for f in dict.fromkeys(fields + ['updated_at', 'id'])]
+    query = select(*columns).order_by(table.c.updated_at.desc(), table.c.id.desc()).limit(limit + 1)
+    
+    if category:
+        query = query.where(table.c.category == category)
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            updated_at, page_id = decode_cursor(cursor)
+            updated_at = datetime.fromisoformat(updated_at)
+        except (InvalidCursor, ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.where(or_(
+            table.c.updated_at < updated_at,
+            and_(table.c.updated_at == updated_at, table.c.id < page_id)
+        ))
+    
+    rows = db.session.execute(query).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id)
+    
+    pages = []
+    for row in rows:
+        pages.append({field: getattr(row, field) for field in fields})
+    
+    return jsonify({'pages': pages, 'next_cursor': next_cursor})
+
 @wiki_bp.route('/<string:slug>', methods=['GET'])
+@cached('wiki_pages')
 def get_wiki_page(slug):
     """Get a specific wiki page by slug"""
-    page = WikiPage.query.filter_by(slug=slug).first_or_404()
-    return jsonify(page.to_dict())
+    # Check freshness from the row version before loading the content
+    version = read_wiki_version(slug)
+    if version is None:
+        abort(404)
+    etag, last_modified = row_validators('wiki', version.id, version.updated_at)
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    page = read_wiki_page(slug)
+    if page is None:
+        abort(404)
+    result = page_dict(page)
+    if request.args.get('format') == 'html':
+        del result['content']
+        result.update(rendered(page))
+    return add_validators(jsonify(result), etag, last_modified)
+
+@wiki_bp.route('/search', methods=['GET'])
+def search_wiki_pages():
+    """Full-text search over wiki pages, ranked, with snippets"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', SEARCH_PER_PAGE, type=int), 1), SEARCH_MAX_PER_PAGE)
+    
+    results, total = search_pages(query, per_page, (page - 1) * per_page)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page
+    })
+
+@wiki_bp.route('/<string:slug>/sections', methods=['GET'])
+def get_wiki_page_sections(slug):
+    """Outline of a wiki page: its sections with anchors and byte ranges"""
+    page = db.session.query(
+        WikiPage.id, WikiPage.slug, WikiPage.title, WikiPage.updated_at, WikiPage.sections
+    ).filter_by(slug=slug).first_or_404()
+    etag, last_modified = row_validators('wiki-sections', page.id, page.updated_at)
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    sections = page_sections(page.sections, lambda: load_content(page.id))
+    return add_validators(jsonify({
+        'slug': page.slug,
+        'title': page.title,
+        'sections': [public_section(section) for section in sections]
+    }), etag, last_modified)
+
+@wiki_bp.route('/<string:slug>/sections/<string:anchor>', methods=['GET'])
+def get_wiki_page_section(slug, anchor):
+    """A single section of a wiki page, cut out by the database"""
+    page = db.session.query(
+        WikiPage.id, WikiPage.updated_at, WikiPage.sections
+    ).filter_by(slug=slug).first_or_404()
+    etag, last_modified = row_validators('wiki-section', page.id, page.updated_at)
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    sections = page_sections(page.sections, lambda: load_content(page.id))
+    section = next((s for s in sections if s['anchor'] == anchor), None)
+    if section is None:
+        return jsonify({'error': f'Section "{anchor}" not found'}), 404
+    
+    content = db.session.query(func.substr(
+        WikiPage.content, section['char_start'] + 1, section['char_end'] - section['char_start']
+    )).filter(WikiPage.id == page.id).scalar()
+    
+    result = public_section(section)
+    if request.args.get('format') == 'html':
+        result.update(render_cache.get(content))
+    else:
+        result['content'] = content
+    return add_validators(jsonify(result), etag, last_modified)
+
+def load_content(page_id):
+    return db.session.query(WikiPage.content).filter(WikiPage.id == page_id).scalar()
 
 @wiki_bp.route('/categories', methods=['GET'])
+@cached('wiki_pages')
 def get_categories():
     """Get all unique wiki categories"""
-    categories = db.session.query(WikiPage.category).distinct().all()
-    return jsonify([category[0] for category in categories])
+    etag, last_modified = table_validators('wiki_pages')
+    not_modified_response = not_modified(etag, last_modified)
+    if not_modified_response:
+        return not_modified_response
+    
+    return add_validators(jsonify(read_categories()), etag, last_modified)
 
 @wiki_bp.route('', methods=['POST'])
 def create_wiki_page():
@@ -0,0 +1,401 @@
+"""Set-based ingest of quiz questions.
+
+Rows are validated in a single pass, every topic slug in a batch is resolved
+with one ``SELECT ... WHERE slug IN (...)``, missing topics are created with
+one ``INSERT ... ON CONFLICT DO NOTHING`` and questions are written with
+batched Core inserts (``execute_values`` on psycopg2) instead of one ORM
+object per row. On Postgres question IDs are drawn from the sequence before
+inserting, so the duplicate-detection buckets written alongside always
+belong to this transaction's rows; on SQLite they are read back after each
+batch, which is safe with its single writer.
+
+``QuestionIngest`` also backs the streaming upload modes, which parse NDJSON
+or CSV request bodies row by row and commit in fixed-size batches.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.models import Topic, Question
+from .duplicates import DuplicateFinder, index_inserted
+from .question_index import track_changes
+
+logger = logging.getLogger('app.bulk_ingest')
+
+INSERT_BATCH_SIZE = 1000
+
+# Column layout of questions-answers/*.csv
+CSV_FIELDS = ('topic_slug', 'question_text', 'option1', 'option2', 'option3', 'option4', 'correct_answer')
+
+# 'reject' refuses exact duplicates, 'flag' inserts them and reports them;
+# near-duplicates are always inserted and reported
+DUPLICATE_POLICIES = ('reject', 'flag')
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+REQUIRED_FIELDS = ('topic_slug', 'question_text', 'options', 'correct_answer')
+
+_topics = Topic.__table__
+_questions = Question.__table__
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def default_topic_fields(slug):
+    """Name and description for a topic created implicitly from its slug."""
+    name = slug.replace('-', ' ').title()
+    return {'slug': slug, 'name': name, 'description': f"Questions about {name}"}
+
+
+def validate_question(data):
+    """Return a cleaned copy of a question row or raise ``InvalidRow``."""
+    if not isinstance(data, dict):
+        raise InvalidRow("Expected an object")
+
+    if not all(k in data for k in REQUIRED_FIELDS):
+        raise InvalidRow("Missing required fields")
+
+    if not data['question_text'] or not str(data['question_text']).strip():
+        raise InvalidRow("Empty question text")
+
+    if not isinstance(data['options'], list) or len(data['options']) != 4:
+        raise InvalidRow("Invalid options format")
+
+    if any(opt is None or str(opt).strip() == '' for opt in data['options']):
+        raise InvalidRow("Empty options not allowed")
+
+    try:
+        correct_answer = int(data['correct_answer'])
+    except (ValueError, TypeError):
+        raise InvalidRow("Invalid correct_answer value")
+    if not 0 <= correct_answer <= 3:
+        raise InvalidRow("Invalid correct_answer value")
+
+    topic_slug = str(data['topic_slug'] or '').strip()
+    if not topic_slug:
+        raise InvalidRow("Empty topic_slug")
+
+    return {
+        'topic_slug': topic_slug,
+        'question_text': str(data['question_text']).strip(),
+        'options': [str(opt).strip() for opt in data['options']],
+        'correct_answer': correct_answer
+    }
+
+
+def question_from_csv_row(row):
+    """Turn a ``questions-answers/*.csv`` row into a question dict."""
+    options = [row.get(f'option{i}') for i in range(1, 5)]
+    if not any(options) and row.get('options'):
+        # Single "options" column holding a JSON list or comma-separated values
+        try:
+            options = json.loads(row['options'])
+        except ValueError:
+            options = [opt.strip() for opt in row['options'].split(',')]
+    return {
+        'topic_slug': row.get('topic_slug'),
+        'question_text': row.get('question_text'),
+        'options': options,
+        'correct_answer': row.get('correct_answer')
+    }
+
+
+def iter_lines(stream, encoding='utf-8'):
+    """Yield decoded lines from a binary stream without reading it all."""
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        yield line.decode(encoding)
+
+
+def iter_ndjson_rows(lines):
+    """Yield ``(row_number, data)`` for an NDJSON body.
+
+    Lines that are not valid JSON yield an ``InvalidRow`` instead of data.
+    """
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError:
+            yield row_number, InvalidRow("Invalid JSON")
+
+
+def iter_csv_rows(lines):
+    """Yield ``(row_number, data)`` for a CSV body with a header row."""
+    for row_number, row in enumerate(csv.DictReader(lines), start=1):
+        yield row_number, question_from_csv_row(row)
+
+
+def _describe_match(match):
+    if 'question_id' in match:
+        return f"question {match['question_id']}"
+    return f"row {match['duplicate_of_row']}"
+
+
+def is_empty_row(data):
+    return not data or (isinstance(data, dict) and not any(data.values()))
+
+
+def resolve_topics(session, slugs):
+    """Map each slug to a topic id, creating missing topics in one statement.
+
+    Returns ``(topic_ids, created)`` where ``created`` maps the slugs of newly
+    created topics to their ids. Slugs that could not be created (e.g. the
+    derived name clashes with an existing topic) are absent from the result.
+    """
+    slugs = set(slugs)
+    if not slugs:
+        return {}, {}
+
+    topic_ids = dict(session.execute(
+        select(_topics.c.slug, _topics.c.id).where(_topics.c.slug.in_(slugs))
+    ).all())
+    missing = slugs - topic_ids.keys()
+    if not missing:
+        return topic_ids, {}
+
+    values = [default_topic_fields(slug) for slug in sorted(missing)]
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(_topics).values(values).on_conflict_do_nothing()
+        created = dict(session.execute(stmt.returning(_topics.c.slug, _topics.c.id)).all())
+    else:
+        if dialect == 'sqlite':
+            stmt = sqlite.insert(_topics).values(values).on_conflict_do_nothing()
+        else:
+            stmt = _topics.insert().values(values)
+        session.execute(stmt)
+        # No RETURNING here; SQLite has a single writer, so whatever exists now was ours
+        created = dict(session.execute(
+            select(_topics.c.slug, _topics.c.id).where(_topics.c.slug.in_(missing))
+        ).all())
+
+    topic_ids.update(created)
+    still_missing = missing - topic_ids.keys()
+    if still_missing:
+        # Created concurrently by another request between our SELECT and INSERT
+        topic_ids.update(session.execute(
+            select(_topics.c.slug, _topics.c.id).where(_topics.c.slug.in_(still_missing))
+        ).all())
+    return topic_ids, created
+
+
+def allocate_question_ids(session, count):
+    """Reserve ``count`` IDs from the questions sequence (Postgres only)."""
+    return session.execute(
+        text("SELECT nextval(pg_get_serial_sequence('questions', 'id')) FROM generate_series(1, :count)"),
+        {'count': count}
+    ).scalars().all()
+
+
+def copy_questions(session, rows):
+    """Write question rows with ``COPY ... FROM STDIN`` (Postgres only).
+
+    Rows carry their ``id`` (see ``allocate_question_ids``). Runs on the
+    session's own connection, so the rows commit or roll back with the rest
+    of the session's transaction.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    now = datetime.utcnow().isoformat()
+    for row in rows:
+        writer.writerow([
+            row['id'], row['topic_id'], row['question_text'], json.dumps(row['options']),
+            row['correct_answer'], row['content_hash'], now
+        ])
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            'COPY questions (id, topic_id, question_text, options, correct_answer, content_hash, created_at) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+class QuestionIngest:
+    """Accumulates validated rows and writes them with set-based statements.
+
+    Call ``add`` for every incoming row and ``flush`` to write what is
+    pending; committing is left to the caller. Counters and per-row errors
+    are kept across flushes so a single summary covers the whole upload.
+    Each flushed row is checked for duplicates within its topic and handled
+    according to ``duplicate_policy``.
+    """
+
+    def __init__(self, session, batch_size=INSERT_BATCH_SIZE, use_copy=False,
+                 duplicate_policy='reject', near_threshold=NEAR_DUPLICATE_THRESHOLD):
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {duplicate_policy}")
+        self.session = session
+        self.batch_size = batch_size
+        self.duplicate_policy = duplicate_policy
+        self.near_threshold = near_threshold
+        # COPY is only used where the driver supports it
+        self.use_copy = use_copy and session.get_bind().dialect.name == 'postgresql'
+        self.success = 0
+        self.failed = 0
+        self.topics_created = 0
+        self._errors = []
+        self.duplicates = []
+        self.rows_read = 0
+        self.batches = 0
+        self._pending = []
+        self._topic_ids = {}
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, row_number, data):
+        """Validate one row; invalid rows are counted and reported, not raised."""
+        self.rows_read += 1
+        if is_empty_row(data):
+            return False
+        try:
+            if isinstance(data, InvalidRow):
+                raise data
+            question = validate_question(data)
+        except InvalidRow as e:
+            self.fail(row_number, str(e))
+            return False
+        question['row'] = row_number
+        self._pending.append(question)
+        return True
+
+    def preload_topics(self, topic_ids):
+        """Seed the slug -> topic id map, e.g. with topics resolved up front."""
+        self._topic_ids.update(topic_ids)
+
+    @property
+    def errors(self):
+        """Error messages in row order, whichever step rejected the row."""
+        return [message for _, message in sorted(self._errors, key=lambda error: error[0])]
+
+    def fail(self, row_number, message):
+        self.failed += 1
+        self._errors.append((row_number, f"Row {row_number}: {message}"))
+
+    def flush(self):
+        """Resolve topics and insert all pending questions."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        unknown = {q['topic_slug'] for q in pending} - self._topic_ids.keys()
+        if unknown:
+            topic_ids, created = resolve_topics(self.session, unknown)
+            self._topic_ids.update(topic_ids)
+            for slug in sorted(created):
+                logger.info("Created new topic: %s (%s)", default_topic_fields(slug)['name'], slug)
+            self.topics_created += len(created)
+            track_changes(self.session, topics=created.values())
+
+        rows = []
+        for question in pending:
+            topic_id = self._topic_ids.get(question['topic_slug'])
+            if topic_id is None:
+                self.fail(question['row'], f"Could not create topic '{question['topic_slug']}'")
+                continue
+            question['topic_id'] = topic_id
+            rows.append(question)
+
+        finder = DuplicateFinder(self.session, self.near_threshold)
+        finder.prepare(rows)
+        accepted = []
+        for row in rows:
+            match = finder.match(row)
+            if match is not None:
+                if match['kind'] == 'exact' and self.duplicate_policy == 'reject':
+                    self.fail(row['row'], "Duplicate of " + _describe_match(match))
+                    continue
+                self.duplicates.append(dict(match, row=row['row']))
+            finder.remember(row)
+            accepted.append(row)
+
+        values = [{
+            'topic_id': row['topic_id'],
+            'question_text': row['question_text'],
+            'options': row['options'],
+            'correct_answer': row['correct_answer'],
+            'content_hash': row['content_hash']
+        } for row in accepted]
+
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            # IDs are taken from the sequence first, so the buckets below are
+            # tied to our own rows whatever other writers are doing
+            for value, question_id in zip(values, allocate_question_ids(self.session, len(values))):
+                value['id'] = question_id
+            if self.use_copy:
+                copy_questions(self.session, values)
+            else:
+                for start in range(0, len(values), self.batch_size):
+                    self.session.execute(_questions.insert(), values[start:start + self.batch_size])
+        elif dialect == 'sqlite':
+            # SQLite has a single writer: from our first INSERT on we hold the
+            # write lock, so a batch's rows get consecutive IDs ending at max(id)
+            for start in range(0, len(values), self.batch_size):
+                batch = values[start:start + self.batch_size]
+                self.session.execute(_questions.insert(), batch)
+                last_id = self.session.execute(select(func.max(_questions.c.id))).scalar()
+                for question_id, value in enumerate(batch, start=last_id - len(batch) + 1):
+                    value['id'] = question_id
+        else:
+            # No sequences and no single writer; insert one by one to learn each ID
+            for value in values:
+                value['id'] = self.session.execute(_questions.insert(), value).inserted_primary_key[0]
+        for row, value in zip(accepted, values):
+            row['id'] = value['id']
+        index_inserted(self.session, accepted)
+
+        track_changes(self.session, reloaded={row['topic_id'] for row in accepted})
+        self.success += len(accepted)
+        return len(accepted)
+
+    def commit_batch(self):
+        """Flush and commit pending rows as one batch.
+
+        A batch that fails to commit is rolled back and reported as a range
+        of failed rows; earlier batches stay committed.
+        """
+        if not self._pending:
+            return
+        first, last = self._pending[0]['row'], self._pending[-1]['row']
+        count = len(self._pending)
+        success, topics_created = self.success, self.topics_created
+        failed, errors, duplicates = self.failed, len(self._errors), len(self.duplicates)
+        try:
+            self.flush()
+            self.session.commit()
+            self.batches += 1
+        except Exception as e:
+            self.session.rollback()
+            # Topics created in this batch were rolled back too
+            self._topic_ids.clear()
+            self.success, self.topics_created = success, topics_created
+            # Rows flush rejected one by one are part of the range below
+            self.failed = failed + count
+            del self._errors[errors:]
+            del self.duplicates[duplicates:]
+            self._errors.append((first, f"Rows {first}-{last}: {str(e)}"))
+
+    def summary(self):
+        return {
+            'success': self.success,
+            'failed': self.failed,
+            'topics_created': self.topics_created,
+            'duplicates': self.duplicates if self.duplicates else None,
+            'errors': self.errors if self._errors else None
+        }
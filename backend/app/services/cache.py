@@ -0,0 +1,276 @@
+"""Shared cache of read endpoint responses, invalidated by tags.
+
+``cached('topics')`` on a view stores its 200 responses (body, ETag and
+Last-Modified) under the request path and query string, tagged with the
+tables the response is built from. A hit is served, or answered with a
+304, without touching the database.
+
+Every committed write that bumps a ``table_versions`` counter invalidates
+the tag of that table (see ``versions.bump_version``), whichever route or
+script made it. Tags are versioned: each entry remembers the tag versions
+read before its view ran and is ignored once any of them moves on, so a
+response built while a write was committing is never served as fresh.
+Views run on a cache miss read from the primary (see ``replicas.py``): a
+replica may lag behind the write that just invalidated the tag, and its
+response would otherwise be stored under the new tag version.
+
+``CACHE_BACKEND`` picks the store:
+
+- ``memory``: an LRU with TTL in each worker process. With
+  ``CACHE_REDIS_URL`` set, invalidations are also published on a Redis
+  channel that every worker subscribes to, so all of them drop stale
+  entries within milliseconds. Without it only the worker that made the
+  write drops its entries: the others, and other pods, keep serving the old
+  response for up to ``CACHE_TTL``, so use it alone only with a single
+  worker process.
+- ``redis``: entries and tag versions live in Redis (or anything speaking
+  its protocol), shared by all workers and pods. Invalidation is an INCR of
+  the tag, seen by every reader at once.
+- ``none`` (default): no caching.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import db
+from .conditional import add_validators, not_modified
+from .replicas import replica_in_use, use_primary
+from .versions import CHANGED_TABLES_KEY
+
+try:
+    import redis
+except ImportError:  # only needed for CACHE_BACKEND=redis or CACHE_REDIS_URL
+    redis = None
+
+BACKENDS = ('none', 'memory', 'redis')
+INVALIDATION_CHANNEL = 'cache-invalidations'
+
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry TTL and versioned tags."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return [self._tags.get(tag, 0) for tag in tags]
+
+    def get(self, key, tags):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires, versions, value = entry
+            if expires < time.monotonic() or versions != [self._tags.get(tag, 0) for tag in tags]:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, versions, ttl=None):
+        with self._lock:
+            self._items[key] = (time.monotonic() + (ttl or self.ttl), versions, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RedisCache:
+    """Entries and tag versions stored in Redis; ``client`` is redis-py compatible."""
+
+    def __init__(self, client, prefix='cache:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _tag_keys(self, tags):
+        return [f'{self.prefix}tag:{tag}' for tag in tags]
+
+    def tag_versions(self, tags):
+        return [int(v or 0) for v in self.client.mget(self._tag_keys(tags))] if tags else []
+
+    def get(self, key, tags):
+        # Entry and current tag versions in one round trip
+        raw, *versions = self.client.mget([self.prefix + key] + self._tag_keys(tags))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if entry['versions'] != [int(v or 0) for v in versions]:
+            return None
+        return entry['value']
+
+    def set(self, key, value, versions, ttl=None):
+        self.client.set(
+            self.prefix + key, json.dumps({'versions': versions, 'value': value}), ex=int(ttl or self.ttl)
+        )
+
+    def invalidate(self, tags):
+        pipeline = self.client.pipeline()
+        for tag_key in self._tag_keys(tags):
+            pipeline.incr(tag_key)
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """Flask extension holding the configured backend and the invalidation channel."""
+
+    def __init__(self):
+        self.backend = None
+        self.publisher = None
+        self.channel = INVALIDATION_CHANNEL
+        self._subscriber_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, redis_client=None):
+        """Set up the backend; ``redis_client`` overrides ``CACHE_REDIS_URL`` (e.g. a stand-in)."""
+        choice = app.config.get('CACHE_BACKEND', 'none')
+        if choice not in BACKENDS:
+            raise ValueError(f"CACHE_BACKEND must be one of {', '.join(BACKENDS)}, not {choice!r}")
+        url = app.config.get('CACHE_REDIS_URL')
+        if redis_client is None and url:
+            if redis is None:
+                raise RuntimeError("CACHE_REDIS_URL is set but the redis package is not installed")
+            redis_client = redis.Redis.from_url(url)
+        if choice == 'redis' and redis_client is None:
+            raise RuntimeError("CACHE_BACKEND is redis but CACHE_REDIS_URL is not set")
+
+        ttl = app.config.get('CACHE_TTL', 300)
+        self.channel = f"{app.config.get('CACHE_KEY_PREFIX', 'cache:')}{INVALIDATION_CHANNEL}"
+        self.publisher = None
+        if choice == 'memory':
+            self.backend = MemoryCache(app.config.get('CACHE_SIZE', 1024), ttl)
+            self.publisher = redis_client
+            if redis_client is None:
+                print(f"Response cache is per worker without CACHE_REDIS_URL; "
+                      f"other workers may serve stale responses for up to {ttl}s")
+        elif choice == 'redis':
+            self.backend = RedisCache(redis_client, app.config.get('CACHE_KEY_PREFIX', 'cache:'), ttl)
+        else:
+            self.backend = None
+        app.extensions['response_cache'] = self
+
+    def _ensure_subscriber(self):
+        # Started lazily so it runs in each gunicorn worker, not the master
+        if self.publisher is None or self._subscriber_pid == os.getpid():
+            return
+        with self._lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            pubsub = self.publisher.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_message})
+            pubsub.run_in_thread(sleep_time=1, daemon=True)
+            self._subscriber_pid = os.getpid()
+
+    def _on_message(self, message):
+        self.backend.invalidate(json.loads(message['data']))
+
+    def invalidate(self, tags):
+        tags = sorted(tags)
+        if self.backend is None or not tags:
+            return
+        # Runs after the write has committed, so errors must not escape;
+        # entries missed here still expire after CACHE_TTL
+        try:
+            self.backend.invalidate(tags)
+            if self.publisher is not None:
+                self.publisher.publish(self.channel, json.dumps(tags))
+        except Exception as e:
+            print(f"Error invalidating cache tags {tags}: {str(e)}")
+
+    def get(self, key, tags):
+        self._ensure_subscriber()
+        return self.backend.get(key, tags)
+
+
+response_cache = ResponseCache()
+
+
+def _serve(entry):
+    last_modified = datetime.fromisoformat(entry['last_modified']) if entry['last_modified'] else None
+    not_modified_response = not_modified(entry['etag'], last_modified)
+    if not_modified_response:
+        return not_modified_response
+    response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+    return add_validators(response, entry['etag'], last_modified)
+
+
+def cached(*tags, ttl=None):
+    """Cache a GET view's responses, invalidated when any of ``tags`` changes."""
+    tags = list(tags)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = response_cache
+            if cache.backend is None or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = f"{request.path}?{request.query_string.decode('latin-1')}"
+            try:
+                entry = cache.get(key, tags)
+                versions = cache.backend.tag_versions(tags) if entry is None else None
+            except Exception as e:
+                print(f"Error reading response cache: {str(e)}")
+                return view(*args, **kwargs)
+            if entry is not None:
+                return _serve(entry)
+
+            # What gets stored must not come from a lagging replica
+            use_primary(db.session)
+            response = current_app.make_response(view(*args, **kwargs))
+            etag, _ = response.get_etag()
+            if (
+                response.status_code == 200 and etag and not response.is_streamed
+                and not replica_in_use(db.session)
+            ):
+                try:
+                    cache.backend.set(key, {
+                        'body': response.get_data(as_text=True),
+                        'mimetype': response.mimetype,
+                        'etag': etag,
+                        'last_modified': response.last_modified.replace(tzinfo=None).isoformat()
+                        if response.last_modified else None
+                    }, versions, ttl)
+                except Exception as e:
+                    print(f"Error writing response cache: {str(e)}")
+            return response
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    tables = session.info.pop(CHANGED_TABLES_KEY, None)
+    if tables:
+        response_cache.invalidate(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop(CHANGED_TABLES_KEY, None)
@@ -0,0 +1,131 @@
+"""gzip/brotli compression of API responses.
+
+Responses are compressed after the view has run, using the best encoding the
+client accepts (brotli when the ``brotli`` package is installed, then gzip).
+Small bodies, streamed responses and non-text types are left alone.
+
+Responses that carry an ETag (see ``conditional.py``) are identical for every
+client until the data behind them changes, so their compressed bodies are
+kept in a bounded LRU keyed by path, ETag and encoding; hot wiki pages and
+topic lists are compressed once instead of on every request. Compressing
+turns the ETag weak, as the bytes on the wire now depend on the encoding.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset((
+    'application/json', 'application/javascript', 'application/x-ndjson',
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/markdown'
+))
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressedCache:
+    """Thread-safe LRU of compressed bodies, bounded by entries and bytes."""
+
+    def __init__(self, maxsize=256, max_bytes=32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        return None
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = data
+            self.size += len(data)
+            while len(self._items) > self.maxsize or self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class Compressor:
+    """Flask extension compressing responses in ``after_request``."""
+
+    def __init__(self):
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.cache = CompressedCache()
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        self.cache = CompressedCache(
+            app.config.get('COMPRESS_CACHE_SIZE', self.cache.maxsize),
+            app.config.get('COMPRESS_CACHE_MAX_BYTES', self.cache.max_bytes)
+        )
+        app.extensions['compressor'] = self
+        app.after_request(self.after_request)
+
+    def choose_encoding(self, accept_encodings):
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return accept_encodings.best_match(offered)
+
+    def after_request(self, response):
+        return self.compress_response(response, request.path, request.accept_encodings)
+
+    def compress_response(self, response, path, accept_encodings):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or (response.content_length or 0) < self.min_size
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding(accept_encodings)
+        if encoding is None:
+            return response
+
+        level = self.brotli_quality if encoding == 'br' else self.gzip_level
+        etag, _ = response.get_etag()
+        if etag is None:
+            body = compress(response.get_data(), encoding, level)
+        else:
+            key = (path, etag, encoding)
+            body = self.cache.get(key)
+            if body is None:
+                body = compress(response.get_data(), encoding, level)
+                self.cache.put(key, body)
+            response.set_etag(etag, weak=True)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compressor = Compressor()
@@ -0,0 +1,67 @@
+"""Conditional GET support (ETag / Last-Modified / 304).
+
+Collection endpoints derive their validators from the per-table counters in
+``table_versions``, single rows from their own ``updated_at``. Both are
+checked before the rows are loaded, so a matching request is answered with
+one primary-key lookup and an empty 304.
+
+The validators and ``is_fresh`` also take their inputs explicitly, for the
+ASGI app (``app/asgi.py``), which runs outside a Flask request.
+"""
+import hashlib
+
+from flask import current_app, request
+
+from app.models import db
+from .versions import get_version_info
+
+
+def _args_digest(query_string=None):
+    # Different query strings are different representations
+    if query_string is None:
+        query_string = request.query_string
+    return hashlib.sha1(query_string).hexdigest()[:8]
+
+
+def table_validators(*names, bind=None, query_string=None):
+    """``(etag, last_modified)`` for a response built from the given tables."""
+    bind = db.session if bind is None else bind
+    parts, last_modified = [], None
+    for name in names:
+        version, updated_at = get_version_info(bind, name)
+        parts.append(f'{name}.{version}')
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return '-'.join(parts + [_args_digest(query_string)]), last_modified
+
+
+def row_validators(kind, row_id, updated_at, query_string=None):
+    """``(etag, last_modified)`` for a single row versioned by ``updated_at``."""
+    stamp = updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at else '0'
+    return f'{kind}.{row_id}.{stamp}-{_args_digest(query_string)}', updated_at
+
+
+def is_fresh(if_none_match, if_modified_since, etag, last_modified):
+    """Whether a client sending these (parsed) headers has the current copy."""
+    if if_none_match:
+        # Weak comparison: compressed responses carry a weak ETag
+        return if_none_match.contains_weak(etag)
+    if if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def not_modified(etag, last_modified):
+    """Return a 304 response if the client's copy is current, else None."""
+    if not is_fresh(request.if_none_match, request.if_modified_since, etag, last_modified):
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def add_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Let clients keep a copy but always revalidate it
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,247 @@
+"""Exact and near-duplicate detection for quiz questions.
+
+Every question stores a ``content_hash`` of its normalised text and one
+``question_buckets`` row per LSH band. Checking an incoming question is then
+an indexed lookup on ``(topic_id, content_hash)`` for exact duplicates and
+on ``(topic_id, band, bucket)`` for near-duplicate candidates, which are
+confirmed by comparing shingle sets of just those candidates. Duplicates are
+only looked for within the same topic.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Question, QuestionBucket
+from .fingerprints import content_hash, similarity, text_buckets
+
+_questions = Question.__table__
+_buckets = QuestionBucket.__table__
+
+# Keep IN lists well below SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def _chunks(values, size=_IN_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def bucket_rows(question_id, topic_id, buckets):
+    return [
+        {'question_id': question_id, 'topic_id': topic_id, 'band': band, 'bucket': bucket}
+        for band, bucket in buckets
+    ]
+
+
+def index_questions(session, questions):
+    """Store LSH buckets for ``(question_id, topic_id, question_text)`` triples."""
+    rows = []
+    for question_id, topic_id, text in questions:
+        rows.extend(bucket_rows(question_id, topic_id, text_buckets(text)))
+    for chunk in _chunks(rows, 5000):
+        session.execute(_buckets.insert(), chunk)
+
+
+def index_inserted(session, rows):
+    """Store buckets for ``rows`` just inserted with Core statements.
+
+    Rows must carry their new ``id`` and the ``buckets`` computed by
+    ``DuplicateFinder.prepare``.
+    """
+    new_rows = []
+    for row in rows:
+        new_rows.extend(bucket_rows(row['id'], row['topic_id'], row['buckets']))
+    for chunk in _chunks(new_rows, 5000):
+        session.execute(_buckets.insert(), chunk)
+
+
+class DuplicateFinder:
+    """Matches a batch of incoming rows against stored questions and each other.
+
+    Call ``prepare`` once with the whole batch (three indexed queries), then
+    ``match`` for each row in order and ``remember`` for the rows that are
+    going to be inserted, so later rows in the batch are checked against them.
+    """
+
+    def __init__(self, session, threshold):
+        self.session = session
+        self.threshold = threshold
+        self._stored_hashes = {}
+        self._stored_buckets = defaultdict(set)
+        self._stored_texts = {}
+        self._batch_hashes = {}
+        self._batch_buckets = defaultdict(list)
+
+    def prepare(self, rows):
+        """Fingerprint ``rows`` in place and load matching stored questions."""
+        for row in rows:
+            row['content_hash'] = content_hash(row['question_text'])
+            row['buckets'] = text_buckets(row['question_text'])
+        if not rows:
+            return
+
+        topic_ids = {row['topic_id'] for row in rows}
+        for hashes in _chunks({row['content_hash'] for row in rows}):
+            for question_id, topic_id, hash_ in self.session.execute(
+                select(_questions.c.id, _questions.c.topic_id, _questions.c.content_hash)
+                .where(_questions.c.topic_id.in_(topic_ids), _questions.c.content_hash.in_(hashes))
+            ):
+                self._stored_hashes.setdefault((topic_id, hash_), question_id)
+
+        buckets = {bucket for row in rows for _, bucket in row['buckets']}
+        for chunk in _chunks(buckets):
+            for question_id, topic_id, band, bucket in self.session.execute(
+                select(_buckets.c.question_id, _buckets.c.topic_id, _buckets.c.band, _buckets.c.bucket)
+                .where(_buckets.c.topic_id.in_(topic_ids), _buckets.c.bucket.in_(chunk))
+            ):
+                self._stored_buckets[(topic_id, band, bucket)].add(question_id)
+
+        candidates = set().union(*self._stored_buckets.values()) if self._stored_buckets else set()
+        for chunk in _chunks(candidates):
+            self._stored_texts.update(self.session.execute(
+                select(_questions.c.id, _questions.c.question_text).where(_questions.c.id.in_(chunk))
+            ).all())
+
+    def match(self, row):
+        """Return a description of the best duplicate of ``row``, or None."""
+        key = (row['topic_id'], row['content_hash'])
+        if key in self._stored_hashes:
+            return {'kind': 'exact', 'question_id': self._stored_hashes[key]}
+        if key in self._batch_hashes:
+            return {'kind': 'exact', 'duplicate_of_row': self._batch_hashes[key]['row']}
+
+        best = None
+        seen = set()
+        for band, bucket in row['buckets']:
+            bucket_key = (row['topic_id'], band, bucket)
+            for question_id in self._stored_buckets.get(bucket_key, ()):
+                if ('q', question_id) not in seen:
+                    seen.add(('q', question_id))
+                    score = similarity(row['question_text'], self._stored_texts.get(question_id, ''))
+                    if score >= self.threshold and (best is None or score > best['similarity']):
+                        best = {'kind': 'near', 'question_id': question_id, 'similarity': round(score, 3)}
+            for other in self._batch_buckets.get(bucket_key, ()):
+                if ('r', other['row']) not in seen:
+                    seen.add(('r', other['row']))
+                    score = similarity(row['question_text'], other['question_text'])
+                    if score >= self.threshold and (best is None or score > best['similarity']):
+                        best = {'kind': 'near', 'duplicate_of_row': other['row'], 'similarity': round(score, 3)}
+        return best
+
+    def remember(self, row):
+        self._batch_hashes.setdefault((row['topic_id'], row['content_hash']), row)
+        for band, bucket in row['buckets']:
+            self._batch_buckets[(row['topic_id'], band, bucket)].append(row)
+
+
+def find_clusters(session, topic_id, threshold):
+    """Group a topic's duplicate questions into exact and near clusters."""
+    exact = []
+    duplicate_hashes = [
+        row[0] for row in session.execute(
+            select(_questions.c.content_hash)
+            .where(_questions.c.topic_id == topic_id, _questions.c.content_hash.isnot(None))
+            .group_by(_questions.c.content_hash)
+            .having(func.count() > 1)
+        )
+    ]
+    for hashes in _chunks(duplicate_hashes):
+        groups = defaultdict(list)
+        for question_id, text, hash_ in session.execute(
+            select(_questions.c.id, _questions.c.question_text, _questions.c.content_hash)
+            .where(_questions.c.topic_id == topic_id, _questions.c.content_hash.in_(hashes))
+            .order_by(_questions.c.id)
+        ):
+            groups[hash_].append({'id': question_id, 'question': text})
+        exact.extend({'content_hash': hash_, 'questions': questions} for hash_, questions in groups.items())
+
+    # Candidate pairs share at least one LSH bucket
+    a, b = _buckets.alias('a'), _buckets.alias('b')
+    pairs = session.execute(
+        select(a.c.question_id, b.c.question_id).distinct()
+        .where(
+            a.c.topic_id == topic_id, b.c.topic_id == topic_id,
+            a.c.band == b.c.band, a.c.bucket == b.c.bucket,
+            a.c.question_id < b.c.question_id
+        )
+    ).all()
+
+    involved = {question_id for pair in pairs for question_id in pair}
+    questions = {}
+    for chunk in _chunks(involved):
+        for question_id, text, hash_ in session.execute(
+            select(_questions.c.id, _questions.c.question_text, _questions.c.content_hash)
+            .where(_questions.c.id.in_(chunk))
+        ):
+            questions[question_id] = (text, hash_)
+
+    parent = {}
+
+    def root(question_id):
+        while parent.get(question_id, question_id) != question_id:
+            question_id = parent[question_id]
+        return question_id
+
+    scores = {}
+    for left, right in pairs:
+        if left not in questions or right not in questions:
+            continue
+        if questions[left][1] == questions[right][1]:
+            continue  # already reported as an exact cluster
+        score = similarity(questions[left][0], questions[right][0])
+        if score >= threshold:
+            left_root, right_root = root(left), root(right)
+            if left_root != right_root:
+                parent[max(left_root, right_root)] = min(left_root, right_root)
+            scores[(left, right)] = score
+
+    clusters = defaultdict(list)
+    for question_id in sorted({q for pair in scores for q in pair}):
+        clusters[root(question_id)].append(question_id)
+    near = []
+    for members in clusters.values():
+        member_set = set(members)
+        near.append({
+            'similarity': round(min(
+                score for (left, right), score in scores.items() if left in member_set
+            ), 3),
+            'questions': [{'id': q, 'question': questions[q][0]} for q in members]
+        })
+
+    return {'exact': exact, 'near': near}
+
+
+def _text_or_topic_changed(obj):
+    state = inspect(obj)
+    return state.attrs.question_text.history.has_changes() or state.attrs.topic_id.history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_buckets(session, flush_context):
+    new = [
+        (obj.id, obj.topic_id, obj.question_text)
+        for obj in session.new if isinstance(obj, Question)
+    ]
+    if new:
+        index_questions(session, new)
+
+    # Edited text (or a move to another topic) gets a new hash and buckets
+    changed = [
+        obj for obj in session.dirty
+        if isinstance(obj, Question) and obj not in session.deleted and _text_or_topic_changed(obj)
+    ]
+    for obj in changed:
+        session.execute(
+            _questions.update().where(_questions.c.id == obj.id)
+            .values(content_hash=content_hash(obj.question_text))
+        )
+        session.execute(_buckets.delete().where(_buckets.c.question_id == obj.id))
+    if changed:
+        index_questions(session, [(obj.id, obj.topic_id, obj.question_text) for obj in changed])
+
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Question)]
+    for chunk in _chunks(deleted):
+        # The FK cascades on Postgres; SQLite does not enforce it by default
+        session.execute(_buckets.delete().where(_buckets.c.question_id.in_(chunk)))
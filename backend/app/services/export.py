@@ -0,0 +1,116 @@
+"""Keyset-paginated reads and streaming export of the question bank.
+
+Both read through SQLAlchemy Core projections instead of ORM objects. The
+export iterates a server-side cursor (``stream_results`` + ``yield_per``)
+and yields encoded chunks, so memory stays constant however large the bank
+is. CSV output uses the ``questions-answers/*.csv`` layout and can be fed
+straight back into ``bulk_upload_questions.py`` or the bulk endpoint;
+NDJSON output matches the streaming NDJSON upload. ``stream_all_questions``
+serves the unpaginated ``GET /api/quiz/questions`` the same way, as one JSON
+array.
+"""
+import csv
+import io
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.models import db
+from app.models.models import Topic, Question
+from .bulk_ingest import CSV_FIELDS
+from .reads import question_dict
+
+EXPORT_CHUNK_SIZE = 1000
+
+_questions = Question.__table__
+_topics = Topic.__table__
+
+
+def _filtered(query, topic_slug):
+    if topic_slug:
+        query = query.where(_topics.c.slug == topic_slug)
+    return query
+
+
+def page_questions(after_id, limit, topic_slug=None):
+    """Return ``(questions, next_after_id)`` shaped like ``Question.to_dict``."""
+    query = _filtered(
+        select(_questions.c.id, _questions.c.question_text, _questions.c.options, _questions.c.correct_answer)
+        .select_from(_questions.join(_topics))
+        .where(_questions.c.id > after_id)
+        .order_by(_questions.c.id)
+        .limit(limit + 1),
+        topic_slug
+    )
+    rows = db.session.execute(query).all()
+    next_after_id = rows[limit - 1].id if len(rows) > limit else None
+    return [{
+        'id': row.id,
+        'question': row.question_text,
+        'options': row.options,
+        'correct_answer': row.correct_answer
+    } for row in rows[:limit]], next_after_id
+
+
+def _export_rows(topic_slug):
+    query = _filtered(
+        select(_questions.c.id, _topics.c.slug, _questions.c.question_text,
+               _questions.c.options, _questions.c.correct_answer)
+        .select_from(_questions.join(_topics))
+        .order_by(_questions.c.id)
+        .execution_options(stream_results=True),
+        topic_slug
+    )
+    return db.session.execute(query).yield_per(EXPORT_CHUNK_SIZE)
+
+
+def stream_all_questions():
+    """Every question as one JSON array (``Question.to_dict`` shape), in chunks."""
+    rows = db.session.execute(
+        select(_questions.c.id, _questions.c.question_text, _questions.c.options, _questions.c.correct_answer)
+        .order_by(_questions.c.id)
+        .execution_options(stream_results=True)
+    ).yield_per(EXPORT_CHUNK_SIZE)
+    parts = ['[']
+    for index, row in enumerate(rows):
+        if index:
+            parts.append(',')
+        parts.append(current_app.json.dumps(question_dict(row, shuffle=False)))
+        if len(parts) >= 2 * EXPORT_CHUNK_SIZE:
+            yield ''.join(parts)
+            parts = []
+    parts.append(']\n')
+    yield ''.join(parts)
+
+
+def export_ndjson(topic_slug=None):
+    lines = []
+    for row in _export_rows(topic_slug):
+        lines.append(current_app.json.dumps({
+            'id': row.id,
+            'topic_slug': row.slug,
+            'question_text': row.question_text,
+            'options': row.options,
+            'correct_answer': row.correct_answer
+        }) + '\n')
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def export_csv(topic_slug=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for row in _export_rows(topic_slug):
+        options = (list(row.options or []) + [''] * 4)[:4]
+        writer.writerow([row.slug, row.question_text, *options, row.correct_answer])
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
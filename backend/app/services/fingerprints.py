@@ -0,0 +1,72 @@
+"""Text fingerprints for duplicate question detection.
+
+``content_hash`` identifies exact duplicates after normalisation (case,
+punctuation and whitespace are ignored). ``minhash`` and ``band_buckets``
+build a MinHash/LSH signature over word shingles: two questions whose
+shingle sets are similar land in the same bucket for at least one band with
+high probability, so near-duplicates are found with an indexed bucket lookup
+instead of comparing against every stored question.
+"""
+import hashlib
+import random
+import re
+
+SHINGLE_SIZE = 3
+NUM_PERM = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_MASK64 = (1 << 64) - 1
+_PERMUTATIONS = [random.Random(1729 + i).getrandbits(64) for i in range(NUM_PERM)]
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def content_hash(text):
+    """SHA-1 hex digest of the normalised text."""
+    return hashlib.sha1(normalize(text).encode('utf-8')).hexdigest()
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingles(text):
+    """Set of hashed word shingles of the normalised text."""
+    words = normalize(text).split()
+    if len(words) <= SHINGLE_SIZE:
+        return {_hash64(' '.join(words))}
+    return {
+        _hash64(' '.join(words[i:i + SHINGLE_SIZE]))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(shingle_set):
+    """MinHash signature using XOR-mask permutations of 64-bit shingle hashes."""
+    return [min(h ^ mask for h in shingle_set) & _MASK64 for mask in _PERMUTATIONS]
+
+
+def band_buckets(signature):
+    """``(band, bucket)`` pairs for LSH; buckets are signed 64-bit integers."""
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(
+            b''.join(v.to_bytes(8, 'big') for v in values), digest_size=8
+        ).digest()
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+
+def text_buckets(text):
+    return band_buckets(minhash(shingles(text)))
+
+
+def similarity(a, b):
+    """Jaccard similarity of two texts' shingle sets."""
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
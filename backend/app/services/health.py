@@ -0,0 +1,113 @@
+"""Liveness and readiness checks for the Kubernetes probes.
+
+``/health/live`` only says the process answers; a failing database must not
+get pods restarted. ``/health/ready`` says whether this pod should get
+traffic and answers 503 when:
+
+- the database does not answer ``SELECT version_num FROM alembic_version``;
+- that revision is older than the newest migration this code ships with
+  (the migration job has not run yet). A revision this code does not know is
+  taken to be newer, so pods of the previous release stay ready while a
+  rollout migrates;
+- the connection pool is at ``READINESS_MAX_POOL_SATURATION`` or above;
+- the pod is serving ``READINESS_MAX_IN_FLIGHT`` requests or more (0 turns
+  this off), so the load balancer sheds load to other pods.
+
+The database query runs at most once every ``READINESS_CHECK_INTERVAL``
+seconds per process, by one thread at a time; every other probe is answered
+from the last result, so probes cost no connection of their own.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.models import db
+from . import metrics
+from .pool_metrics import pool_snapshot
+
+_VERSION_QUERY = text("SELECT version_num FROM alembic_version")
+
+
+def migration_revisions(directory):
+    """``(all revisions, heads)`` of the migration scripts in ``directory``."""
+    from alembic.script import ScriptDirectory
+
+    if not os.path.isdir(directory):
+        return set(), set()
+    scripts = ScriptDirectory(directory)
+    return {script.revision for script in scripts.walk_revisions()}, set(scripts.get_heads())
+
+
+class Readiness:
+    def __init__(self, check_interval=2.0, max_pool_saturation=0.9, max_in_flight=0):
+        self.check_interval = check_interval
+        self.max_pool_saturation = max_pool_saturation
+        self.max_in_flight = max_in_flight
+        self.revisions = set()
+        self.heads = set()
+        self.database = {'ok': False, 'error': 'not checked yet'}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('READINESS_CHECK_INTERVAL', self.check_interval)
+        self.max_pool_saturation = app.config.get('READINESS_MAX_POOL_SATURATION', self.max_pool_saturation)
+        self.max_in_flight = app.config.get('READINESS_MAX_IN_FLIGHT', self.max_in_flight)
+        self.revisions, self.heads = migration_revisions(
+            os.path.join(os.path.dirname(app.root_path), 'migrations')
+        )
+        app.extensions['readiness'] = self
+
+    def _check_database(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        # One thread queries, the others keep using the last result
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            started = time.perf_counter()
+            try:
+                with db.engine.connect().execution_options(slow_query_log=False) as connection:
+                    revision = connection.execute(_VERSION_QUERY).scalar()
+                self.database = {
+                    'ok': True, 'revision': revision,
+                    'latency_ms': round((time.perf_counter() - started) * 1000, 2)
+                }
+            except Exception as e:
+                self.database = {'ok': False, 'error': str(e).splitlines()[0]}
+            self._checked_at = now
+        finally:
+            self._lock.release()
+
+    def migrations(self):
+        revision = self.database.get('revision')
+        result = {'revision': revision, 'heads': sorted(self.heads)}
+        # Newer than this code (unknown revision) is fine; older is not
+        result['ok'] = self.database['ok'] and (revision in self.heads or revision not in self.revisions)
+        return result
+
+    def pool(self):
+        snapshot = pool_snapshot(db.engine)
+        saturation = snapshot.get('saturation', 0.0)
+        return {'ok': saturation < self.max_pool_saturation, 'saturation': saturation}
+
+    def in_flight(self):
+        # Not counting the probe itself
+        value = max(metrics.in_flight() - 1, 0)
+        return {'ok': not self.max_in_flight or value < self.max_in_flight, 'value': value}
+
+    def check(self):
+        """``(ready, checks)``; every check is a dict with an ``ok`` flag."""
+        checks = {'pool': self.pool(), 'in_flight': self.in_flight()}
+        if checks['pool']['ok']:
+            # An exhausted pool would make the probe wait for a connection
+            self._check_database()
+        checks['database'] = self.database
+        checks['migrations'] = self.migrations()
+        return all(check['ok'] for check in checks.values()), checks
+
+
+readiness = Readiness()
@@ -0,0 +1,70 @@
+"""JSON providers for ``app.json`` (``jsonify``, ``request.get_json``).
+
+``OrjsonProvider`` serialises with orjson, which encodes dicts, lists and
+datetimes natively in C and writes the response body as bytes directly.
+``StdlibProvider`` is the fallback when orjson is not installed. Both emit
+datetimes as ISO 8601 (``2024-01-02T03:04:05.123456``), so models and views
+can put ``datetime`` values straight into their payloads, and neither sorts
+keys. ``JSON_PROVIDER`` picks one: ``auto`` (orjson when available),
+``orjson`` or ``stdlib``.
+"""
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # stdlib json only
+    orjson = None
+
+
+def _iso_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return _default(value)
+
+
+class StdlibProvider(DefaultJSONProvider):
+    default = staticmethod(_iso_default)
+    ensure_ascii = False
+    sort_keys = False
+
+
+class OrjsonProvider(StdlibProvider):
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dump_bytes(self, obj, indent=False):
+        option = self.options | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=_iso_default, option=option)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like; let the stdlib cope
+            return super().dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self.dump_bytes(obj, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def make_provider(app):
+    """Build the provider selected by ``JSON_PROVIDER``."""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice not in ('auto', 'orjson', 'stdlib'):
+        raise ValueError(f"JSON_PROVIDER must be auto, orjson or stdlib, not {choice!r}")
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is orjson but orjson is not installed")
+    if choice == 'stdlib' or orjson is None:
+        return StdlibProvider(app)
+    return OrjsonProvider(app)
@@ -0,0 +1,171 @@
+"""Prometheus metrics for the API, served at ``/metrics``.
+
+Per request, labelled by blueprint and URL rule (never the raw path, to keep
+label cardinality bounded): duration, response size, and the number and
+total time of the SQL statements it ran, counted with the engine's
+``before_cursor_execute``/``after_cursor_execute`` events. ``in_flight``
+gauges requests being served (and feeds the readiness probe and the HPA,
+see ``health.py``). ``app_startup_seconds``,
+``app_warmup_seconds`` and ``app_worker_boot_seconds`` report cold starts.
+The ``db_pool_*`` series, labelled by pool name, mirror the ``/api/pool``
+counters (see ``pool_metrics.py``) so saturation can be graphed and scaled on.
+
+Under gunicorn each worker is a separate process. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (``gunicorn.conf.py`` does it), every
+worker writes its samples there and ``/metrics`` merges all of them, so a
+scrape of any worker reports the whole pod.
+"""
+import os
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_LABELS = ('method', 'blueprint', 'route')
+_SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+_SIZE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000, 5000000)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time spent serving a request',
+    _LABELS + ('status',)
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size as sent (after compression)',
+    _LABELS, buckets=_SIZE_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests currently being served',
+    multiprocess_mode='livesum'
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements executed per request',
+    _LABELS, buckets=_SQL_COUNT_BUCKETS
+)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds', 'Total SQL execution time per request',
+    _LABELS
+)
+SQL_STATEMENTS = Counter(
+    'sql_statements', 'SQL statements executed, in requests or not'
+)
+# Cold start, see services/warmup.py and gunicorn.conf.py
+STARTUP_DURATION = Gauge(
+    'app_startup_seconds', 'Seconds from server start until workers were started',
+    multiprocess_mode='max'
+)
+WARMUP_DURATION = Gauge(
+    'app_warmup_seconds', 'Seconds spent warming caches before serving',
+    multiprocess_mode='max'
+)
+# Connection pools, updated by services/pool_metrics.py
+POOL_CAPACITY = Gauge(
+    'db_pool_capacity', 'Connections the pool may hand out (size plus max overflow)',
+    ('pool',), multiprocess_mode='livesum'
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_connections_checked_out', 'Connections currently checked out of the pool',
+    ('pool',), multiprocess_mode='livesum'
+)
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow', 'Overflow connections currently open beyond the pool size',
+    ('pool',), multiprocess_mode='livesum'
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a connection from the pool',
+    ('pool',), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+POOL_TIMEOUTS = Counter(
+    'db_pool_checkout_timeouts', 'Checkouts that gave up waiting for a connection',
+    ('pool',)
+)
+WORKER_BOOT_DURATION = Histogram(
+    'app_worker_boot_seconds', 'Seconds from fork until a worker was ready to serve',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+
+def _labels():
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return request.method, request.blueprint or '', rule
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+    IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(*_labels()).observe(response.content_length)
+    return response
+
+
+def _teardown_request(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    IN_FLIGHT.dec()
+    labels = _labels()
+    status = g.pop('metrics_status', 500)
+    REQUEST_DURATION.labels(*labels, str(status)).observe(time.perf_counter() - started)
+    REQUEST_SQL_STATEMENTS.labels(*labels).observe(g.pop('sql_statements', 0))
+    REQUEST_SQL_DURATION.labels(*labels).observe(g.pop('sql_seconds', 0.0))
+
+
+# The start time lives on the statement's execution context, which is dropped
+# with the statement, so one that raises cannot skew later timings
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_query_start', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    SQL_STATEMENTS.inc()
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+
+def _registry():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def in_flight():
+    """Requests being served by this process, or by all workers under gunicorn."""
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return int(IN_FLIGHT._value.get())
+    for metric in _registry().collect():
+        if metric.name == 'http_requests_in_flight':
+            return int(sum(sample.value for sample in metric.samples))
+    return 0
+
+
+def metrics_view():
+    return generate_latest(_registry()), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+
+def init_app(app):
+    # Registered before the compressor, so its after_request runs after
+    # compression and sees the size actually sent
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,27 @@
+"""Opaque cursors for keyset pagination."""
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row into a URL-safe token."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Unpack a token made by ``encode_cursor`` into its list of values."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor")
+    return values
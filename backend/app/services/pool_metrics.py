@@ -0,0 +1,142 @@
+"""Connection pool classes that keep checkout and wait-time counters.
+
+``MeteredQueuePool`` and ``MeteredNullPool`` behave exactly like their
+SQLAlchemy bases but time every connection checkout and count the ones that
+are in use or timed out. Counters live in ``pool_stats`` keyed by the pool's
+``pool_logging_name`` (``primary`` by default), so they survive
+``engine.dispose()``. ``pool_snapshot`` combines them with the pool's own
+size and overflow for the ``/api/pool`` endpoint. The same counters are
+exported on ``/metrics`` as the ``db_pool_*`` series, which under gunicorn
+are summed over all workers.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from .metrics import (
+    POOL_CAPACITY, POOL_CHECKED_OUT, POOL_CHECKOUT_WAIT, POOL_OVERFLOW, POOL_TIMEOUTS
+)
+
+# Checkouts slower than this count as having waited for a connection
+WAIT_THRESHOLD = 0.001
+
+
+class PoolStats:
+    def __init__(self, name):
+        self.name = name
+        self.checkouts = 0
+        self.in_use = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def checked_out(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self._record_wait(seconds)
+        POOL_CHECKED_OUT.labels(self.name).inc()
+
+    def timed_out(self, seconds):
+        with self._lock:
+            self.timeouts += 1
+            self._record_wait(seconds)
+        POOL_TIMEOUTS.labels(self.name).inc()
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use -= 1
+        POOL_CHECKED_OUT.labels(self.name).dec()
+
+    def _record_wait(self, seconds):
+        if seconds >= WAIT_THRESHOLD:
+            self.waits += 1
+        self.wait_seconds += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        POOL_CHECKOUT_WAIT.labels(self.name).observe(seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'in_use': self.in_use,
+                'waits': self.waits,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'wait_seconds_max': round(self.max_wait, 6),
+                'timeouts': self.timeouts
+            }
+
+
+pool_stats = {}
+_stats_lock = threading.Lock()
+
+
+def stats_for(name):
+    name = name or 'primary'
+    with _stats_lock:
+        if name not in pool_stats:
+            pool_stats[name] = PoolStats(name)
+        return pool_stats[name]
+
+
+class _Metered:
+    def _do_get(self):
+        stats = stats_for(self._orig_logging_name)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            stats.timed_out(time.perf_counter() - started)
+            raise
+        stats.checked_out(time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, conn):
+        stats_for(self._orig_logging_name).checked_in()
+        super()._do_return_conn(conn)
+
+
+class MeteredQueuePool(_Metered, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        POOL_CAPACITY.labels(self._name()).set(self.size() + max(self._max_overflow, 0))
+
+    def _name(self):
+        return self._orig_logging_name or 'primary'
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        finally:
+            POOL_OVERFLOW.labels(self._name()).set(max(self.overflow(), 0))
+
+    def _do_return_conn(self, conn):
+        super()._do_return_conn(conn)
+        POOL_OVERFLOW.labels(self._name()).set(max(self.overflow(), 0))
+
+
+class MeteredNullPool(_Metered, NullPool):
+    pass
+
+
+def pool_snapshot(engine):
+    """Live counters for ``engine``'s pool."""
+    pool = engine.pool
+    snapshot = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        size = pool.size()
+        snapshot.update({
+            'size': size,
+            'max_overflow': pool._max_overflow,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            # Share of the pool plus overflow currently handed out
+            'saturation': round(pool.checkedout() / max(size + max(pool._max_overflow, 0), 1), 3)
+        })
+    snapshot.update(stats_for(getattr(pool, '_orig_logging_name', None)).to_dict())
+    return snapshot
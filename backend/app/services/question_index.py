@@ -0,0 +1,239 @@
+"""Per-worker index of topics and their question IDs.
+
+Maps a topic slug to the topic's id, name and a compact ``array('i')`` of
+question IDs, so ``get_quiz`` can pick its questions without querying for
+the topic or scanning the questions table. The arrays are never modified
+once published; ``apply`` swaps in updated copies, so readers can sample
+them without taking the lock.
+
+Writes made through the ORM are picked up by SQLAlchemy session events and
+patched into the index once the transaction commits. Code that writes with
+Core statements (bulk ingest) reports its changes through ``track_changes``.
+Every tracked write also bumps the ``topics``/``questions`` counters in
+``table_versions``; workers compare those counters at most once every
+``QUESTION_INDEX_CHECK_INTERVAL`` seconds and drop the whole index when a
+write happened somewhere else.
+"""
+import threading
+import time
+from array import array
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import db
+from app.models.models import Topic, Question
+from .versions import bump_version, get_versions
+
+TRACKED_TABLES = ('topics', 'questions')
+
+_CHANGES_KEY = 'question_index_changes'
+
+
+class TopicEntry:
+    __slots__ = ('id', 'name', 'slug', 'question_ids')
+
+    def __init__(self, id, name, slug, question_ids):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.question_ids = question_ids
+
+
+class QuestionIndex:
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.versions = None
+        self._entries = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('QUESTION_INDEX_CHECK_INTERVAL', self.check_interval)
+        app.extensions['question_index'] = self
+
+    def get(self, slug, bind=None):
+        """Return the ``TopicEntry`` for ``slug``, or None if the topic does not exist.
+
+        Queries run on ``db.session`` unless another ``bind`` is given.
+        """
+        bind = db.session if bind is None else bind
+        self._check_version(bind)
+        entry = self._entries.get(slug)
+        if entry is None:
+            entry = self._load(slug, bind)
+        return entry
+
+    def load_all(self, bind=None):
+        """Load every topic at once (warm-up) instead of each on first use."""
+        bind = db.session if bind is None else bind
+        versions = get_versions(bind, TRACKED_TABLES)
+        entries, entries_by_id = {}, {}
+        for row in bind.execute(select(Topic.id, Topic.name, Topic.slug)):
+            entry = TopicEntry(row.id, row.name, row.slug, array('i'))
+            entries[row.slug] = entries_by_id[row.id] = entry
+        for row in bind.execute(select(Question.topic_id, Question.id).order_by(Question.id)):
+            entry = entries_by_id.get(row.topic_id)
+            if entry is not None:
+                entry.question_ids.append(row.id)
+        with self._lock:
+            # Versions were read first; a write since then shows up on the next check
+            self._entries = entries
+            self.versions = versions
+            self._checked_at = time.monotonic()
+        return len(entries)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.versions = None
+            self._checked_at = 0.0
+
+    def _check_version(self, bind):
+        now = time.monotonic()
+        if self.versions is not None and now - self._checked_at < self.check_interval:
+            return
+        versions = get_versions(bind, TRACKED_TABLES)
+        with self._lock:
+            if versions != self.versions:
+                self._entries.clear()
+                self.versions = versions
+            self._checked_at = now
+
+    def _load(self, slug, bind):
+        versions = self.versions
+        topic = bind.execute(select(Topic.id, Topic.name).where(Topic.slug == slug)).first()
+        if topic is None:
+            return None
+        question_ids = array('i', (
+            row[0] for row in
+            bind.execute(select(Question.id).where(Question.topic_id == topic.id).order_by(Question.id))
+        ))
+        entry = TopicEntry(topic.id, topic.name, slug, question_ids)
+        with self._lock:
+            # Only keep the entry if no commit was applied while we were loading
+            if self.versions == versions:
+                self._entries[slug] = entry
+        return entry
+
+    def apply(self, changes):
+        """Patch the index with the changes of a committed transaction."""
+        with self._lock:
+            if self.versions is None or any(
+                self.versions.get(name) != base for name, base in changes['base'].items()
+            ):
+                # Someone else wrote in between; we cannot patch safely
+                self._entries.clear()
+                self.versions = None
+                return
+
+            entries_by_id = {entry.id: entry for entry in self._entries.values()}
+            # Topics that changed wholesale are dropped and reloaded on next use
+            for topic_id in changes['topics']:
+                entry = entries_by_id.pop(topic_id, None)
+                if entry is not None:
+                    del self._entries[entry.slug]
+
+            # Copy-on-write: readers sample the arrays without the lock, so a
+            # published array is never changed, only replaced
+            updated = {}
+
+            def copy_of(topic_id):
+                if topic_id not in updated:
+                    updated[topic_id] = array('i', entries_by_id[topic_id].question_ids)
+                return updated[topic_id]
+
+            for topic_id, question_id in changes['removed']:
+                if topic_id in entries_by_id and question_id in copy_of(topic_id):
+                    copy_of(topic_id).remove(question_id)
+
+            for topic_id, question_id in changes['added']:
+                if topic_id in entries_by_id:
+                    copy_of(topic_id).append(question_id)
+
+            for topic_id, question_ids in updated.items():
+                entries_by_id[topic_id].question_ids = question_ids
+
+            # A new dict, never updated in place: _load compares against the one it started with
+            self.versions = dict(self.versions, **changes['current'])
+
+
+question_index = QuestionIndex()
+
+
+def track_changes(session, added=(), removed=(), topics=(), reloaded=()):
+    """Record index changes made in ``session``'s current transaction.
+
+    ``added`` and ``removed`` are ``(topic_id, question_id)`` pairs and
+    ``topics`` holds IDs of topics that were created, renamed or deleted.
+    ``reloaded`` holds IDs of topics whose questions changed in ways that
+    cannot be listed pair by pair (Core bulk inserts); their entries are
+    dropped and rebuilt on next use. The matching ``table_versions``
+    counters are bumped immediately; the index itself is patched after the
+    transaction commits.
+    """
+    added, removed = list(added), list(removed)
+    topics, reloaded = set(topics), set(reloaded)
+    if not (added or removed or topics or reloaded):
+        return
+
+    changes = session.info.setdefault(_CHANGES_KEY, {
+        'added': [], 'removed': [], 'topics': set(), 'base': {}, 'current': {}
+    })
+    changes['added'].extend(added)
+    changes['removed'].extend(removed)
+    changes['topics'].update(topics | reloaded)
+
+    touched = []
+    if added or removed or reloaded:
+        touched.append('questions')
+    if topics:
+        touched.append('topics')
+    for name in touched:
+        version = bump_version(session, name)
+        changes['base'].setdefault(name, version - 1)
+        changes['current'][name] = version
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    added, removed, topics, reloaded = [], [], set(), set()
+
+    for obj in session.new:
+        if isinstance(obj, Question):
+            added.append((obj.topic_id, obj.id))
+        elif isinstance(obj, Topic):
+            topics.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Question):
+            history = inspect(obj).attrs.topic_id.history
+            if history.has_changes():
+                removed.extend((topic_id, obj.id) for topic_id in history.deleted if topic_id)
+                added.append((obj.topic_id, obj.id))
+            elif session.is_modified(obj):
+                # Content changed; keeps the questions counter honest for conditional GETs
+                reloaded.add(obj.topic_id)
+        elif isinstance(obj, Topic):
+            if session.is_modified(obj):
+                topics.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            removed.append((obj.topic_id, obj.id))
+        elif isinstance(obj, Topic):
+            topics.add(obj.id)
+
+    track_changes(session, added, removed, topics, reloaded)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        question_index.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,78 @@
+"""Signed quiz tokens.
+
+``get_quiz`` hands out a token describing exactly what was served: the topic,
+the question IDs, the option order shown for each question and a digest of
+the correct answer in that order. ``submit_quiz`` grades from the token alone,
+without touching the database, and rejects submissions that were not issued
+by us.
+
+The token is signed with ``SECRET_KEY`` but not encrypted, so the answer key
+is stored as a keyed HMAC per question rather than as plain indexes.
+"""
+import hashlib
+import hmac
+import secrets
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+_SALT = 'quiz-token'
+_DIGEST_SIZE = 8
+
+
+class InvalidQuizToken(Exception):
+    pass
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=_SALT)
+
+
+def _answer_digest(nonce, question_id, answer):
+    key = (current_app.config['SECRET_KEY'] + ':quiz-answer').encode()
+    message = f'{nonce}:{question_id}:{answer}'.encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:_DIGEST_SIZE]
+
+
+def issue_token(topic_slug, served):
+    """Sign a token for ``served``, a list of ``(question_id, order, correct)``.
+
+    ``order`` lists the original option indexes in the order they were shown
+    and ``correct`` is the index of the right answer in that order.
+    """
+    nonce = secrets.token_hex(4)
+    return _serializer().dumps({
+        's': topic_slug,
+        'n': nonce,
+        'q': [
+            [question_id, ''.join(str(i) for i in order), _answer_digest(nonce, question_id, correct)]
+            for question_id, order, correct in served
+        ]
+    })
+
+
+def read_token(token):
+    """Verify ``token`` and return its payload; raises ``InvalidQuizToken``."""
+    try:
+        return _serializer().loads(token, max_age=current_app.config['QUIZ_TOKEN_MAX_AGE'])
+    except BadSignature as e:
+        raise InvalidQuizToken(str(e))
+
+
+def grade(payload, answers):
+    """Return ``(correct, total)`` for ``answers`` against a token payload.
+
+    ``answers`` maps question IDs (as strings) to the index of the chosen
+    option in the order it was served.
+    """
+    nonce = payload['n']
+    correct_count = 0
+    for question_id, _, digest in payload['q']:
+        submitted = answers.get(str(question_id))
+        try:
+            submitted = int(submitted)
+        except (TypeError, ValueError):
+            continue
+        if hmac.compare_digest(_answer_digest(nonce, question_id, submitted), digest):
+            correct_count += 1
+    return correct_count, len(payload['q'])
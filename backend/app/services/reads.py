@@ -0,0 +1,110 @@
+"""ORM-free read path for the hot GET endpoints.
+
+Topics, quiz questions and wiki pages are read with SQLAlchemy Core
+``select()`` statements built once at import time, with bind parameters for
+everything that varies, so each compiles once and is then served from the
+engine's compiled cache. Rows are turned straight into the JSON shapes of
+``Topic.to_dict``, ``Question.to_dict`` and ``WikiPage.to_dict`` without
+identity-map or attribute-instrumentation overhead. Writes keep using the
+ORM; ``benchmarks/bench_reads.py`` checks that both paths return the same
+data.
+
+Each reader runs on ``db.session`` unless given another ``bind`` (a
+session or a connection); the ASGI app (``app/asgi.py``) passes the sync
+side of an async connection through ``AsyncConnection.run_sync``.
+"""
+from sqlalchemy import bindparam, select
+
+from app.models import db
+from app.models.models import Question, Topic, WikiPage, shuffle_options
+
+_topics = Topic.__table__
+_questions = Question.__table__
+_pages = WikiPage.__table__
+
+_PAGE_COLUMNS = (
+    _pages.c.id, _pages.c.slug, _pages.c.title, _pages.c.content, _pages.c.category,
+    _pages.c.created_at, _pages.c.updated_at, _pages.c.author, _pages.c.is_published
+)
+
+_ALL_TOPICS = select(_topics.c.slug, _topics.c.name, _topics.c.description)
+_QUESTIONS = select(_questions.c.id, _questions.c.question_text, _questions.c.options, _questions.c.correct_answer)
+_QUESTIONS_BY_ID = _QUESTIONS.where(_questions.c.id.in_(bindparam('ids', expanding=True)))
+_ALL_PAGES = select(*_PAGE_COLUMNS)
+_PAGES_BY_CATEGORY = _ALL_PAGES.where(_pages.c.category == bindparam('category'))
+_PAGE_VERSION = select(_pages.c.id, _pages.c.updated_at).where(_pages.c.slug == bindparam('slug'))
+_CATEGORIES = select(_pages.c.category).distinct()
+# Includes the stored render for wiki_render.rendered()
+_PAGE_BY_SLUG = select(
+    *_PAGE_COLUMNS, _pages.c.content_html, _pages.c.toc, _pages.c.rendered_hash
+).where(_pages.c.slug == bindparam('slug'))
+
+
+def topic_dict(row):
+    """``Topic.to_dict`` shape."""
+    return {'id': row.slug, 'title': row.name, 'description': row.description}
+
+
+def question_dict(row, shuffle=True):
+    """``Question.to_dict`` shape."""
+    if shuffle:
+        shuffled = shuffle_options(row.options, row.correct_answer)
+        return {
+            'id': row.id,
+            'question': row.question_text,
+            'options': shuffled['options'],
+            'correct_answer': shuffled['correct_answer']
+        }
+    return {
+        'id': row.id,
+        'question': row.question_text,
+        'options': row.options,
+        'correct_answer': row.correct_answer
+    }
+
+
+def page_dict(row):
+    """``WikiPage.to_dict`` shape."""
+    return {column.name: row._mapping[column.name] for column in _PAGE_COLUMNS}
+
+
+def _bind(bind):
+    return db.session if bind is None else bind
+
+
+def read_topics(bind=None):
+    return [topic_dict(row) for row in _bind(bind).execute(_ALL_TOPICS)]
+
+
+def read_all_questions(bind=None):
+    return [question_dict(row, shuffle=False) for row in _bind(bind).execute(_QUESTIONS)]
+
+
+def read_questions(question_ids, bind=None):
+    """Question rows for ``question_ids``, in that order."""
+    if not question_ids:
+        return []
+    rows = {row.id: row for row in _bind(bind).execute(_QUESTIONS_BY_ID, {'ids': list(question_ids)})}
+    return [rows[qid] for qid in question_ids if qid in rows]
+
+
+def read_wiki_pages(category=None, bind=None):
+    if category:
+        rows = _bind(bind).execute(_PAGES_BY_CATEGORY, {'category': category})
+    else:
+        rows = _bind(bind).execute(_ALL_PAGES)
+    return [page_dict(row) for row in rows]
+
+
+def read_wiki_version(slug, bind=None):
+    """``(id, updated_at)`` of the page for ``slug``, or None."""
+    return _bind(bind).execute(_PAGE_VERSION, {'slug': slug}).first()
+
+
+def read_wiki_page(slug, bind=None):
+    """The page row for ``slug`` (with its stored render), or None."""
+    return _bind(bind).execute(_PAGE_BY_SLUG, {'slug': slug}).first()
+
+
+def read_categories(bind=None):
+    return [row.category for row in _bind(bind).execute(_CATEGORIES)]
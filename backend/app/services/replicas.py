@@ -0,0 +1,150 @@
+"""Routing of read-only requests to read replicas.
+
+``DATABASE_URL_READ`` (comma-separated) adds one ``replica_N`` bind per
+replica. ``RoutingSession`` then sends the statements of GET and HEAD
+requests to a replica, picked round-robin and kept for the rest of the
+request. Everything else goes to the primary:
+
+- requests with any other method, and code running outside a request
+  (scripts, the CLI);
+- INSERT/UPDATE/DELETE statements and everything during a flush;
+- every statement after the session has written or ``use_primary`` was
+  called, so a request reads its own writes.
+
+Replicas whose lag exceeds ``REPLICA_MAX_LAG`` seconds are skipped. Lag is
+measured from the ``table_versions`` counters, so it works for any backend,
+including two SQLite files standing in for primary and replica. When a
+replica is behind on a table, it is taken to be lagging since its own last
+applied write to that table, which errs on the side of the primary.
+"""
+import itertools
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_METHODS = ('GET', 'HEAD')
+
+_PRIMARY_KEY = 'use_primary'
+_REPLICA_KEY = 'replica'
+_table_versions = sa.table(
+    'table_versions', sa.column('name'), sa.column('version'), sa.column('updated_at', sa.DateTime)
+)
+
+
+def _read_versions(engine):
+    with engine.connect() as connection:
+        return {
+            row.name: (row.version, row.updated_at)
+            for row in connection.execute(sa.select(_table_versions))
+        }
+
+
+def replica_lag(primary, replica):
+    """Seconds the ``replica`` engine is behind ``primary``; 0 when caught up."""
+    now = datetime.utcnow()
+    replica_versions = _read_versions(replica)
+    lag = 0.0
+    for name, (version, updated_at) in _read_versions(primary).items():
+        replica_version, replica_updated_at = replica_versions.get(name, (0, None))
+        if replica_version < version:
+            if replica_updated_at is None:
+                return float('inf')
+            lag = max(lag, (now - replica_updated_at).total_seconds())
+    return lag
+
+
+class ReplicaRouter:
+    """Tracks replica lag and hands out the replicas fit to read from."""
+
+    def __init__(self, max_lag=5.0, check_interval=1.0):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lags = {}
+        self._checked_at = 0.0
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_lag = app.config.get('REPLICA_MAX_LAG', self.max_lag)
+        self.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', self.check_interval)
+        app.extensions['replica_router'] = self
+
+    def _check(self, engines, names):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        # One thread measures, the others keep using the last measurement
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            lags = {}
+            for name in names:
+                try:
+                    lags[name] = replica_lag(engines[None], engines[name])
+                except sa.exc.SQLAlchemyError as e:
+                    print(f"Replica {name} unavailable: {e}")
+                    lags[name] = float('inf')
+            self.lags = lags
+            self._checked_at = now
+        finally:
+            self._lock.release()
+
+    def choose(self, engines):
+        """Name of a replica within the lag tolerance, or None for the primary."""
+        names = sorted(name for name in engines if name and name.startswith('replica_'))
+        if not names:
+            return None
+        self._check(engines, names)
+        fresh = [name for name in names if self.lags.get(name, float('inf')) <= self.max_lag]
+        if not fresh:
+            return None
+        return fresh[next(self._turn) % len(fresh)]
+
+    def status(self):
+        return {
+            name: {'lag_seconds': None if lag == float('inf') else round(lag, 3), 'in_rotation': lag <= self.max_lag}
+            for name, lag in self.lags.items()
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+def use_primary(session):
+    """Send the rest of ``session``'s statements to the primary."""
+    session.info[_PRIMARY_KEY] = True
+
+
+def replica_in_use(session):
+    """Whether ``session`` has read from a replica in this request."""
+    return session.info.get(_REPLICA_KEY) is not None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from replicas during GET requests."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None or not self._reads_from_replica(clause):
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        if _REPLICA_KEY not in self.info:
+            self.info[_REPLICA_KEY] = replica_router.choose(engines)
+        name = self.info[_REPLICA_KEY]
+        if name is None:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        return engines[name]
+
+    def _reads_from_replica(self, clause):
+        if self._flushing or self.info.get(_PRIMARY_KEY) or isinstance(clause, UpdateBase):
+            return False
+        return has_request_context() and request.method in READ_METHODS
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _stick_to_primary(session, flush_context):
+    use_primary(session)
@@ -0,0 +1,29 @@
+"""Question sampling for quizzes.
+
+Picks question IDs first (from the per-worker ``question_index``) and only
+hydrates the rows that were chosen, so the cost of building a quiz no longer
+grows with the size of the topic's bank. Rows are read through the Core read
+path (``reads.read_questions``), not as ORM objects.
+"""
+import random
+
+from .reads import read_questions
+
+
+def sample_ids(question_ids, k):
+    """Uniformly pick up to ``k`` distinct IDs from ``question_ids``.
+
+    Safe on the index's arrays without its lock: ``QuestionIndex.apply``
+    replaces them instead of changing them in place.
+    """
+    return random.sample(question_ids, min(k, len(question_ids)))
+
+
+def fetch_questions(question_ids, bind=None):
+    """Load the given questions, preserving the order of ``question_ids``."""
+    return read_questions(question_ids, bind)
+
+
+def sample_questions(question_ids, k, bind=None):
+    """Uniformly sample up to ``k`` questions from ``question_ids``."""
+    return fetch_questions(sample_ids(question_ids, k), bind)
@@ -0,0 +1,156 @@
+"""Opt-in recorder of slow SQL statements.
+
+With ``SLOW_QUERY_THRESHOLD`` (seconds) above zero, every statement that
+takes longer is recorded with its parameters, duration, engine bind and the
+route that issued it. Records go to a bounded ring buffer, served by
+``/api/admin/slow-queries``, and to the ``app.slow_queries`` logger as one
+JSON object per line.
+
+On Postgres a ``SLOW_QUERY_EXPLAIN_SAMPLE`` share of slow SELECTs also gets
+an ``EXPLAIN (ANALYZE, BUFFERS)`` plan. ANALYZE runs the statement again, so
+that happens on a background thread with a connection of its own, inside a
+transaction that is rolled back and under a statement timeout; the request
+that was slow is not delayed any further.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+MAX_STATEMENT_LENGTH = 5000
+MAX_PARAMETERS_LENGTH = 2000
+EXPLAIN_TIMEOUT_MS = 30000
+
+logger = logging.getLogger('app.slow_queries')
+_SELECT = re.compile(r'^\s*(select|with)\b', re.IGNORECASE)
+_WRITE = re.compile(r'\b(insert|update|delete|merge)\b', re.IGNORECASE)
+
+
+def _truncate(value, limit):
+    return value if len(value) <= limit else value[:limit] + '...'
+
+
+def _parameters(parameters, executemany):
+    if executemany:
+        parameters = {'rows': len(parameters), 'first': parameters[0] if parameters else None}
+    return _truncate(json.dumps(parameters, default=repr), MAX_PARAMETERS_LENGTH)
+
+
+def _origin():
+    if not has_request_context():
+        return {'route': None, 'method': None, 'path': None}
+    return {
+        'route': request.url_rule.rule if request.url_rule else None,
+        'method': request.method,
+        'path': request.path
+    }
+
+
+def explainable(statement):
+    return bool(_SELECT.match(statement)) and not _WRITE.search(statement)
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements, fed by engine cursor events."""
+
+    def __init__(self, threshold=0.0, size=200, explain_sample=0.1):
+        self.threshold = threshold
+        self.explain_sample = explain_sample
+        self.entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._explainer = None
+
+    def init_app(self, app, engines):
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD', self.threshold)
+        self.explain_sample = app.config.get('SLOW_QUERY_EXPLAIN_SAMPLE', self.explain_sample)
+        self.entries = deque(maxlen=app.config.get('SLOW_QUERY_BUFFER_SIZE', self.entries.maxlen))
+        app.extensions['slow_query_log'] = self
+        if self.threshold <= 0:
+            return
+        for name, engine in engines.items():
+            self._listen(engine, name or 'primary')
+
+    def _listen(self, engine, name):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            # Kept on the context (see metrics.py), not the connection
+            if context is not None:
+                context._slow_query_start = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, '_slow_query_start', None)
+            if started is None or context.execution_options.get('slow_query_log') is False:
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self.record(engine, name, statement, parameters, executemany, elapsed)
+
+    def record(self, engine, bind, statement, parameters, executemany, elapsed):
+        entry = {
+            'at': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed * 1000, 3),
+            'bind': bind,
+            'statement': _truncate(statement, MAX_STATEMENT_LENGTH),
+            'parameters': _parameters(parameters, executemany),
+            **_origin(),
+            'plan': None
+        }
+        with self._lock:
+            self.entries.append(entry)
+        logger.warning(json.dumps({'event': 'slow_query', **entry}))
+
+        if (
+            engine.dialect.name == 'postgresql'
+            and not executemany
+            and explainable(statement)
+            and random.random() < self.explain_sample
+        ):
+            self._explain(engine, entry, statement, parameters)
+
+    def _explain(self, engine, entry, statement, parameters):
+        if self._explainer is None:
+            self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+        entry['plan'] = 'pending'
+        self._explainer.submit(self._run_explain, engine, entry, statement, parameters)
+
+    def _run_explain(self, engine, entry, statement, parameters):
+        try:
+            with engine.connect().execution_options(slow_query_log=False) as connection:
+                transaction = connection.begin()
+                try:
+                    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                    rows = connection.exec_driver_sql(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                    ).scalars().all()
+                finally:
+                    transaction.rollback()
+            entry['plan'] = '\n'.join(rows)
+        except Exception as e:
+            entry['plan'] = f"EXPLAIN failed: {e}"
+        logger.warning(json.dumps({
+            'event': 'slow_query_plan', 'at': entry['at'], 'statement': entry['statement'], 'plan': entry['plan']
+        }))
+
+    def snapshot(self):
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+# A worker forked from a preloaded master does not inherit the EXPLAIN thread
+os.register_at_fork(after_in_child=lambda: setattr(slow_query_log, '_explainer', None))
@@ -0,0 +1,58 @@
+"""Per-table change counters stored in the ``table_versions`` table.
+
+Writers bump the counter inside their own transaction, so any process can
+tell whether its cached view of a table is stale with a single primary-key
+lookup instead of re-reading the table.
+"""
+from datetime import datetime
+
+from app.models.models import TableVersion
+
+_table = TableVersion.__table__
+
+CHANGED_TABLES_KEY = 'changed_tables'
+
+
+def bump_version(session, name):
+    """Increment the counter for ``name`` and return its new value.
+
+    Runs on the session's connection, so the bump commits or rolls back
+    together with the write that caused it. The table is also noted in
+    ``session.info['changed_tables']`` for after-commit hooks.
+    """
+    session.info.setdefault(CHANGED_TABLES_KEY, set()).add(name)
+    connection = session.connection()
+    result = connection.execute(
+        _table.update()
+        .where(_table.c.name == name)
+        .values(version=_table.c.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            _table.insert().values(name=name, version=1, updated_at=datetime.utcnow())
+        )
+    return connection.execute(
+        _table.select().with_only_columns(_table.c.version).where(_table.c.name == name)
+    ).scalar()
+
+
+def get_versions(session, names):
+    """Current counters for ``names`` as a dict; unknown tables report 0."""
+    rows = session.execute(
+        _table.select()
+        .with_only_columns(_table.c.name, _table.c.version)
+        .where(_table.c.name.in_(list(names)))
+    )
+    versions = {name: 0 for name in names}
+    versions.update({row.name: row.version for row in rows})
+    return versions
+
+
+def get_version_info(session, name):
+    """``(version, updated_at)`` for one table; ``(0, None)`` if never written."""
+    row = session.execute(
+        _table.select()
+        .with_only_columns(_table.c.version, _table.c.updated_at)
+        .where(_table.c.name == name)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
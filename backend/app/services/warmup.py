@@ -0,0 +1,57 @@
+"""Cache warm-up and fork safety for preloaded servers.
+
+``gunicorn.conf.py`` loads the app once in the master (``preload_app``),
+runs ``warm_up`` there and only then forks the workers, which inherit the
+warmed state copy-on-write:
+
+- the question index with every topic and its question IDs, so no quiz
+  request has to load its topic first;
+- the compiled forms of the hot read statements (``services/reads.py``,
+  ``table_versions`` lookups) in each engine's compiled cache. They are run
+  with parameters that match no rows, so warming costs a few milliseconds
+  whatever the size of the data.
+
+Connections must not cross a fork: the master disposes its pools after
+warming up and every worker calls ``dispose_engines(app, close=False)``
+right after the fork, dropping the inherited pool without touching the
+parent's sockets.
+"""
+import time
+
+from app.models import db
+from . import metrics, reads
+from .conditional import table_validators
+from .question_index import question_index
+
+WARMUP_KEY = '__warm_up__'
+
+
+def dispose_engines(app, close=True):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def warm_up(app):
+    """Warm the per-process caches; returns the seconds it took."""
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            topics = question_index.load_all()
+            table_validators('topics', 'wiki_pages', query_string=b'')
+            reads.read_topics()
+            reads.read_categories()
+            reads.read_questions([0])
+            reads.read_wiki_pages(WARMUP_KEY)
+            reads.read_wiki_version(WARMUP_KEY)
+            reads.read_wiki_page(WARMUP_KEY)
+        except Exception as e:
+            # Serve cold rather than not at all
+            print(f"Warm-up failed: {str(e)}")
+            return None
+        finally:
+            db.session.remove()
+    elapsed = time.perf_counter() - started
+    metrics.WARMUP_DURATION.set(elapsed)
+    print(f"Warmed up {topics} topics in {elapsed:.3f}s")
+    return elapsed
@@ -0,0 +1,96 @@
+"""Markdown rendering for wiki pages.
+
+Pages are rendered to sanitised HTML with a table of contents when they are
+written (a ``before_flush`` listener), and the result is stored on the row
+together with a hash of the markdown it came from. Rows written before this
+existed, or whose stored render is stale, are rendered on demand through a
+bounded LRU cache keyed by the same hash.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import markdown
+import nh3
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.models import WikiPage
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'toc']
+RENDER_CACHE_SIZE = 256
+
+_HEADINGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+_ALLOWED_ATTRIBUTES = {tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()}
+for _tag in _HEADINGS:
+    # Keep heading ids so table-of-contents anchors resolve
+    _ALLOWED_ATTRIBUTES.setdefault(_tag, set()).add('id')
+_ALLOWED_ATTRIBUTES.setdefault('code', set()).add('class')
+
+
+def content_digest(content):
+    return hashlib.sha1((content or '').encode('utf-8')).hexdigest()
+
+
+def _flatten_toc(tokens):
+    entries = []
+    for token in tokens:
+        entries.append({'level': token['level'], 'id': token['id'], 'title': token['name']})
+        entries.extend(_flatten_toc(token['children']))
+    return entries
+
+
+def render_markdown(content):
+    """Return ``{'html': ..., 'toc': [...]}`` for a markdown document."""
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    html = md.convert(content or '')
+    return {
+        'html': nh3.clean(html, attributes=_ALLOWED_ATTRIBUTES),
+        'toc': _flatten_toc(md.toc_tokens)
+    }
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered documents keyed by content digest."""
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, content):
+        digest = content_digest(content)
+        with self._lock:
+            if digest in self._items:
+                self._items.move_to_end(digest)
+                return self._items[digest]
+        result = render_markdown(content)
+        with self._lock:
+            self._items[digest] = result
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return result
+
+
+render_cache = RenderCache()
+
+
+def rendered(page):
+    """Stored render of ``page`` when current, otherwise an on-demand one."""
+    if page.content_html is not None and page.rendered_hash == content_digest(page.content):
+        return {'html': page.content_html, 'toc': page.toc or []}
+    return render_cache.get(page.content)
+
+
+def apply_render(page):
+    result = render_markdown(page.content)
+    page.content_html = result['html']
+    page.toc = result['toc']
+    page.rendered_hash = content_digest(page.content)
+
+
+@event.listens_for(Session, 'before_flush')
+def _render_pages(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, WikiPage) and obj.rendered_hash != content_digest(obj.content):
+            apply_render(obj)
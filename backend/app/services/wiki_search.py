@@ -0,0 +1,259 @@
+"""Full-text search over wiki pages.
+
+On Postgres, search runs against the ``wiki_pages.search_vector`` generated
+``tsvector`` column (title weighted above content) through its GIN index,
+ranked with ``ts_rank_cd`` and with ``ts_headline`` snippets.
+
+Snippets are HTML: the page text is escaped and only the matched terms are
+wrapped in ``<b>``, so clients can render them as they are.
+
+Other databases (SQLite in development and tests) use ``WikiSearchIndex``,
+an in-process inverted index ranked with BM25. It is built on first use,
+patched from the pages written by each committed transaction and dropped
+when the ``wiki_pages`` counter in ``table_versions`` shows a write from
+another process.
+"""
+import html
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.models import db
+from app.models.models import WikiPage
+from .versions import bump_version, get_versions
+
+SEARCH_CONFIG = 'english'
+TITLE_WEIGHT = 3
+SNIPPET_RADIUS = 80
+
+# ts_headline marks matches with these; they are turned into <b> after escaping
+_START_SEL, _STOP_SEL = '\x02', '\x03'
+HEADLINE_OPTIONS = f'MaxFragments=2, MaxWords=30, MinWords=10, StartSel="{_START_SEL}", StopSel="{_STOP_SEL}"'
+
+_CHANGES_KEY = 'wiki_search_changes'
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have how i if in into is it its '
+    'of on or so that the their then there these this to was what when where '
+    'which who why will with you your'.split()
+)
+
+_PG_SEARCH = text(f"""
+    SELECT id, slug, title, category, updated_at,
+           ts_rank_cd(search_vector, query) AS rank,
+           ts_headline('{SEARCH_CONFIG}', content, query, :headline_options) AS snippet,
+           count(*) OVER () AS total
+    FROM wiki_pages, websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query
+    WHERE search_vector @@ query
+    ORDER BY rank DESC, id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def tokenize(value):
+    return [t for t in _TOKEN.findall((value or '').lower()) if t not in _STOPWORDS]
+
+
+def make_snippet(content, terms):
+    """Escaped excerpt of ``content`` around the first query term, terms in <b>."""
+    content = content or ''
+    if not terms:
+        return html.escape(content[:2 * SNIPPET_RADIUS])
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in terms) + r')\b', re.IGNORECASE)
+    found = pattern.search(content)
+    start = max(0, found.start() - SNIPPET_RADIUS) if found else 0
+    excerpt = content[start:start + 2 * SNIPPET_RADIUS]
+    # Split on the raw text so escaping can never break a match (or vice versa)
+    parts = pattern.split(excerpt)
+    return ''.join(
+        f'<b>{html.escape(part)}</b>' if index % 2 else html.escape(part)
+        for index, part in enumerate(parts)
+    )
+
+
+def headline_snippet(headline):
+    """Escape a ``ts_headline`` result and turn its match markers into <b>."""
+    return html.escape(headline or '').replace(_START_SEL, '<b>').replace(_STOP_SEL, '</b>')
+
+
+class WikiSearchIndex:
+    """BM25-ranked inverted index of wiki pages, kept per worker."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._built = False
+        self._pages = {}
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.check_interval = app.config.get('WIKI_SEARCH_CHECK_INTERVAL', self.check_interval)
+        app.extensions['wiki_search_index'] = self
+
+    def _check_version(self):
+        now = time.monotonic()
+        if self._built and now - self._checked_at < self.check_interval:
+            return
+        version = get_versions(db.session, ('wiki_pages',))['wiki_pages']
+        with self._lock:
+            if not self._built or version != self.version:
+                self._rebuild(version)
+            self._checked_at = now
+
+    def _rebuild(self, version):
+        self._pages.clear()
+        self._postings.clear()
+        self._lengths.clear()
+        for page in db.session.query(
+            WikiPage.id, WikiPage.slug, WikiPage.title, WikiPage.category,
+            WikiPage.updated_at, WikiPage.content
+        ):
+            self._add(page._asdict())
+        self.version = version
+        self._built = True
+
+    def _add(self, page):
+        self._remove(page['id'])
+        terms = Counter(tokenize(page['content']))
+        for term in tokenize(page['title']):
+            terms[term] += TITLE_WEIGHT
+        for term, frequency in terms.items():
+            self._postings[term][page['id']] = frequency
+        self._lengths[page['id']] = sum(terms.values())
+        self._pages[page['id']] = page
+
+    def _remove(self, page_id):
+        if page_id not in self._pages:
+            return
+        del self._pages[page_id]
+        del self._lengths[page_id]
+        for term in [t for t, postings in self._postings.items() if page_id in postings]:
+            del self._postings[term][page_id]
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def apply(self, changes):
+        """Patch the index with the wiki pages written by a committed transaction."""
+        with self._lock:
+            if not self._built:
+                return
+            if self.version != changes['base']:
+                self._built = False
+                return
+            for page_id in changes['deleted']:
+                self._remove(page_id)
+            for page in changes['upserted'].values():
+                self._add(page)
+            self.version = changes['current']
+
+    def search(self, query, limit, offset):
+        """Return ``(results, total)``; every query term must match."""
+        self._check_version()
+        terms = tokenize(query)
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            matches = set(postings[0]).intersection(*postings[1:])
+            count = len(self._pages)
+            average_length = sum(self._lengths.values()) / count if count else 0
+            scored = []
+            for page_id in matches:
+                score = 0.0
+                for term_postings in postings:
+                    frequency = term_postings[page_id]
+                    idf = math.log(1 + (count - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+                    norm = 1 - self.B + self.B * self._lengths[page_id] / average_length
+                    score += idf * frequency * (self.K1 + 1) / (frequency + self.K1 * norm)
+                scored.append((-score, page_id))
+            scored.sort()
+            results = []
+            for negative_score, page_id in scored[offset:offset + limit]:
+                page = self._pages[page_id]
+                results.append({
+                    'slug': page['slug'],
+                    'title': page['title'],
+                    'category': page['category'],
+                    'updated_at': page['updated_at'],
+                    'rank': round(-negative_score, 4),
+                    'snippet': make_snippet(page['content'], terms)
+                })
+        return results, len(matches)
+
+
+wiki_search_index = WikiSearchIndex()
+
+
+def search_pages(query, limit, offset):
+    """Ranked wiki search; returns ``(results, total)``."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return wiki_search_index.search(query, limit, offset)
+
+    rows = db.session.execute(_PG_SEARCH, {
+        'q': query, 'limit': limit, 'offset': offset, 'headline_options': HEADLINE_OPTIONS
+    }).all()
+    results = [{
+        'slug': row.slug,
+        'title': row.title,
+        'category': row.category,
+        'updated_at': row.updated_at,
+        'rank': round(row.rank, 4),
+        'snippet': headline_snippet(row.snippet)
+    } for row in rows]
+    total = rows[0].total if rows else 0
+    if not rows and offset:
+        # Past the last page the window count is lost; ask for it directly
+        total = db.session.execute(text(
+            f"SELECT count(*) FROM wiki_pages "
+            f"WHERE search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}', :q)"
+        ), {'q': query}).scalar()
+    return results, total
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    upserted, deleted = {}, set()
+    for obj in session.new | session.dirty:
+        if isinstance(obj, WikiPage):
+            upserted[obj.id] = {
+                'id': obj.id, 'slug': obj.slug, 'title': obj.title, 'category': obj.category,
+                'updated_at': obj.updated_at, 'content': obj.content
+            }
+    for obj in session.deleted:
+        if isinstance(obj, WikiPage):
+            deleted.add(obj.id)
+    if not (upserted or deleted):
+        return
+
+    changes = session.info.setdefault(_CHANGES_KEY, {'upserted': {}, 'deleted': set()})
+    for page_id in deleted:
+        changes['upserted'].pop(page_id, None)
+    changes['deleted'] |= deleted
+    changes['upserted'].update(upserted)
+    version = bump_version(session, 'wiki_pages')
+    changes.setdefault('base', version - 1)
+    changes['current'] = version
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        wiki_search_index.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,96 @@
+"""Heading index of wiki pages for section-by-section fetches.
+
+When a page's content is written, its ATX headings (``#`` .. ``######``,
+outside fenced code blocks) are indexed into ``WikiPage.sections``. Each
+entry records the heading's anchor (the same id the rendered HTML uses),
+title, level and where its section starts and ends, both as UTF-8 byte
+offsets for clients and as character offsets so the database can cut a
+single section out with ``substr`` without loading the whole document. A
+section runs until the next heading of the same or a higher level.
+"""
+import re
+
+from markdown.extensions.toc import slugify, unique
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.models import WikiPage
+
+_HEADING = re.compile(r'^ {0,3}(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+_INLINE = re.compile(r'[*_`~]')
+
+
+def _plain(title):
+    return _INLINE.sub('', _LINK.sub(r'\1', title)).strip()
+
+
+def build_sections(content):
+    """Return the section index of a markdown document."""
+    content = content or ''
+    headings = []
+    fence = None
+    char_offset = byte_offset = 0
+    for line in content.splitlines(keepends=True):
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+        elif fence is None:
+            match = _HEADING.match(line.rstrip('\r\n'))
+            if match:
+                headings.append((len(match.group(1)), _plain(match.group(2)), char_offset, byte_offset))
+        char_offset += len(line)
+        byte_offset += len(line.encode('utf-8'))
+
+    sections = []
+    used_ids = set()
+    for index, (level, title, char_start, byte_start) in enumerate(headings):
+        char_end, byte_end = char_offset, byte_offset
+        for next_level, _, next_char, next_byte in headings[index + 1:]:
+            if next_level <= level:
+                char_end, byte_end = next_char, next_byte
+                break
+        sections.append({
+            'anchor': unique(slugify(title, '-'), used_ids),
+            'title': title,
+            'level': level,
+            'start': byte_start,
+            'end': byte_end,
+            'char_start': char_start,
+            'char_end': char_end
+        })
+    return sections
+
+
+def page_sections(page_sections_value, content_loader):
+    """Stored sections, or ones built from ``content_loader()`` for legacy rows."""
+    if page_sections_value is not None:
+        return page_sections_value
+    return build_sections(content_loader())
+
+
+def public_section(section):
+    """Section entry as exposed by the API (byte offsets only)."""
+    return {
+        'anchor': section['anchor'],
+        'title': section['title'],
+        'level': section['level'],
+        'start': section['start'],
+        'end': section['end'],
+        'length': section['end'] - section['start']
+    }
+
+
+@event.listens_for(Session, 'before_flush')
+def _index_sections(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, WikiPage):
+            obj.sections = build_sections(obj.content)
+    for obj in session.dirty:
+        if isinstance(obj, WikiPage) and inspect(obj).attrs.content.history.has_changes():
+            obj.sections = build_sections(obj.content)
@@ -0,0 +1,6 @@
+from app.asgi import create_asgi_app
+
+# Async read endpoints, everything else through Flask:
+#   uvicorn asgi:app --host 0.0.0.0 --port 8000
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+app = create_asgi_app()
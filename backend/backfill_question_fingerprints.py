@@ -0,0 +1,40 @@
+"""Fingerprint questions created before duplicate detection existed.
+
+Fills in questions.content_hash and the question_buckets LSH rows for every
+question that has no content hash yet. Safe to re-run; rows are processed
+in batches and each batch commits on its own.
+"""
+from app import create_app
+from app.models import db, Question
+from app.services.duplicates import index_questions
+from app.services.fingerprints import content_hash
+
+BATCH_SIZE = 1000
+
+
+def backfill_question_fingerprints(batch_size=BATCH_SIZE):
+    app = create_app()
+
+    with app.app_context():
+        total = 0
+        while True:
+            rows = db.session.query(Question.id, Question.topic_id, Question.question_text).filter(
+                Question.content_hash.is_(None)
+            ).order_by(Question.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            db.session.bulk_update_mappings(Question, [
+                {'id': question_id, 'content_hash': content_hash(text)}
+                for question_id, _, text in rows
+            ])
+            index_questions(db.session, rows)
+            db.session.commit()
+            total += len(rows)
+            print(f"Fingerprinted {total} questions")
+
+        print(f"Done. {total} questions fingerprinted.")
+
+
+if __name__ == '__main__':
+    backfill_question_fingerprints()
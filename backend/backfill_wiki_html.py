@@ -0,0 +1,93 @@
+"""Render wiki pages whose stored HTML or section index is missing or out of date.
+
+Pages are read in batches by id; each batch's stale pages are rendered in a
+pool of worker processes and written back before the next batch is read.
+Safe to re-run, pages that are already current are skipped.
+
+Usage:
+    python backfill_wiki_html.py [--workers N]
+"""
+import argparse
+import os
+from multiprocessing import Pool
+
+from sqlalchemy import bindparam, select, update
+
+from app import create_app
+from app.models import db, WikiPage
+from app.services.wiki_render import content_digest, render_markdown
+from app.services.wiki_sections import build_sections
+
+BATCH_SIZE = 100
+
+_pages = WikiPage.__table__
+
+
+def render_page(page):
+    page_id, content = page
+    result = render_markdown(content)
+    return {
+        'page_id': page_id,
+        'content_html': result['html'],
+        'toc': result['toc'],
+        'rendered_hash': content_digest(content),
+        'sections': build_sections(content)
+    }
+
+
+def stale_batches():
+    """Yield lists of up to ``BATCH_SIZE`` ``(id, content)`` pairs needing a render.
+
+    Pages are read in keyset batches, so only one batch of content is held
+    in memory at a time.
+    """
+    after_id = 0
+    while True:
+        rows = db.session.execute(
+            select(_pages.c.id, _pages.c.content, _pages.c.rendered_hash, _pages.c.sections)
+            .where(_pages.c.id > after_id).order_by(_pages.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        after_id = rows[-1].id
+        stale = [
+            (row.id, row.content) for row in rows
+            if row.rendered_hash != content_digest(row.content) or row.sections is None
+        ]
+        if stale:
+            yield stale
+
+
+# Keeps updated_at as it is: a render is not an edit, and ETags, Last-Modified
+# and the (updated_at, id) listing order all follow it
+_store_render = (
+    update(_pages)
+    .where(_pages.c.id == bindparam('page_id'))
+    .values(
+        content_html=bindparam('content_html'), toc=bindparam('toc'),
+        rendered_hash=bindparam('rendered_hash'), sections=bindparam('sections'),
+        updated_at=_pages.c.updated_at
+    )
+)
+
+
+def backfill_wiki_html(workers=None):
+    app = create_app()
+
+    with app.app_context():
+        rendered = 0
+        with Pool(workers or os.cpu_count() or 1) as pool:
+            for stale in stale_batches():
+                db.session.execute(_store_render, pool.map(render_page, stale, chunksize=8))
+                db.session.commit()
+                rendered += len(stale)
+                print(f"Rendered {rendered} pages")
+
+        print(f"Done. {rendered} wiki pages rendered.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render stored HTML for existing wiki pages")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    backfill_wiki_html(args.workers)
@@ -0,0 +1,273 @@
+"""Benchmark API endpoints against a synthetic dataset.
+
+Usage:
+    python benchmarks/bench_api.py [--scale tiny] [--database-url URL]
+                                   [--requests 200] [--output results.json]
+                                   [--compare baseline.json [--max-regression 0.2]]
+
+Without ``--database-url`` a temporary SQLite file is created. A given
+database (e.g. a local Postgres) is migrated and, if empty, filled with the
+``benchmarks/synthetic.py`` dataset for ``--scale``; an already filled one
+is reused as is. Every scenario drives the app through the Flask test
+client, one request at a time, after ``--warmup`` untimed requests, and
+reports throughput, latency percentiles, SQL statements per request and
+response size. Results are JSON (stdout, or ``--output``); ``--compare``
+prints the change against an earlier result file and, with
+``--max-regression``, exits non-zero when a scenario's p95 latency or
+statement count grew by more than that fraction.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy
+from flask_migrate import upgrade
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from synthetic import DEFAULT_SEED, SCALES, csv_text, make_app, populate, topic_row
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+PERCENTILES = (50, 90, 95, 99)
+
+_statements = [0]
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    _statements[0] += 1
+
+
+# Each scenario prepares one request (untimed) and returns a callable that
+# sends it. ``ctx`` holds the client, the dataset sizes and a seeded RNG.
+
+def get_topics(ctx):
+    return lambda: ctx['client'].get('/api/topics')
+
+
+def get_quiz(ctx):
+    slug = topic_row(ctx['rng'].randrange(ctx['topics']))['slug']
+    return lambda: ctx['client'].get(f'/api/quiz/{slug}')
+
+
+def submit_quiz(ctx):
+    slug = topic_row(ctx['rng'].randrange(ctx['topics']))['slug']
+    quiz = ctx['client'].get(f'/api/quiz/{slug}').get_json()
+    answers = {str(q['id']): ctx['rng'].randrange(len(q['options'])) for q in quiz['questions']}
+    body = {'topic': slug, 'answers': answers, 'token': quiz['token']}
+    return lambda: ctx['client'].post('/api/quiz/submit', json=body)
+
+
+def wiki_listing(ctx):
+    return lambda: ctx['client'].get('/api/wiki?fields=slug,title,category,updated_at&limit=50')
+
+
+def wiki_category(ctx):
+    category = f"category-{ctx['rng'].randrange(max(1, ctx['pages'] // 100))}"
+    return lambda: ctx['client'].get(f'/api/wiki?category={category}')
+
+
+def wiki_fetch(ctx):
+    slug = f"page-{ctx['rng'].randrange(ctx['pages']):06d}"
+    return lambda: ctx['client'].get(f'/api/wiki/{slug}')
+
+
+def bulk_upload(ctx):
+    ctx['uploads'] += 1
+    body = csv_text(f"bench-upload-{ctx['run']}-{ctx['uploads']}", ctx['upload_rows'], ctx['seed'])
+    return lambda: ctx['client'].post(
+        '/api/quiz/questions/bulk', data=body, headers={'Content-Type': 'text/csv'}
+    )
+
+
+SCENARIOS = {
+    'get_topics': get_topics,
+    'get_quiz': get_quiz,
+    'submit_quiz': submit_quiz,
+    'wiki_listing': wiki_listing,
+    'wiki_category': wiki_category,
+    'wiki_fetch': wiki_fetch,
+    'bulk_upload': bulk_upload,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(ctx, scenario, requests, warmup):
+    for _ in range(warmup):
+        scenario(ctx)()
+
+    latencies, statements, sizes, errors = [], [], [], 0
+    for _ in range(requests):
+        send = scenario(ctx)
+        _statements[0] = 0
+        started = time.perf_counter()
+        response = send()
+        latencies.append(time.perf_counter() - started)
+        statements.append(_statements[0])
+        sizes.append(len(response.get_data()))
+        if response.status_code >= 400:
+            errors += 1
+
+    total = sum(latencies)
+    latencies.sort()
+    result = {
+        'requests': requests,
+        'errors': errors,
+        'total_seconds': round(total, 6),
+        'throughput_rps': round(requests / total, 2) if total else 0.0,
+        'latency_ms': {
+            'mean': round(total / requests * 1000, 3),
+            **{f'p{pct}': round(percentile(latencies, pct) * 1000, 3) for pct in PERCENTILES},
+            'max': round(latencies[-1] * 1000, 3)
+        },
+        'queries_per_request': {
+            'mean': round(sum(statements) / requests, 2),
+            'max': max(statements)
+        },
+        'response_bytes_mean': round(sum(sizes) / requests)
+    }
+    if scenario is bulk_upload:
+        result['rows_per_second'] = round(requests * ctx['upload_rows'] / total, 1) if total else 0.0
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Print changes against ``baseline``; return the scenarios that regressed."""
+    regressed = []
+    print(f"{'scenario':<15}{'p50 ms':>22}{'p95 ms':>22}{'rps':>24}{'queries':>20}", file=sys.stderr)
+    for name, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        cells, growth = [], {}
+        for label, path in (('p50', ('latency_ms', 'p50')), ('p95', ('latency_ms', 'p95')),
+                            ('rps', ('throughput_rps',)), ('queries', ('queries_per_request', 'mean'))):
+            old, new = before, current
+            for key in path:
+                old, new = old[key], new[key]
+            change = (new - old) / old if old else 0.0
+            growth[label] = change
+            cells.append(f"{old:.2f}->{new:.2f} {change:+.0%}")
+        print(f"{name:<15}{cells[0]:>22}{cells[1]:>22}{cells[2]:>24}{cells[3]:>20}", file=sys.stderr)
+        if max_regression is not None and (growth['p95'] > max_regression or growth['queries'] > max_regression):
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    # The app prints progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        results, args = run()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressed = compare(results, json.load(file), args.max_regression)
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints")
+    parser.add_argument('--scale', choices=SCALES, default='tiny')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help="database to benchmark (default: a temporary SQLite file)")
+    parser.add_argument('--requests', type=int, default=200, help="timed requests per scenario")
+    parser.add_argument('--warmup', type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument('--upload-rows', type=int, default=100, help="questions per bulk upload request")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument('--output', help="write results here instead of stdout")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--max-regression', type=float, help="with --compare, fail above this p95/queries growth")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+
+    from app.models import db, Topic, WikiPage
+
+    app = make_app(database_url)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        if not db.session.execute(select(func.count()).select_from(Topic.__table__)).scalar():
+            populate(db.session, args.scale, args.seed)
+        else:
+            print("Reusing the data already in the database")
+        topics = db.session.query(func.count(Topic.id)).filter(Topic.slug.like('topic-%')).scalar()
+        pages = db.session.query(func.count(WikiPage.id)).filter(WikiPage.slug.like('page-%')).scalar()
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+    ctx = {
+        'client': app.test_client(),
+        'rng': random.Random(args.seed),
+        'seed': args.seed,
+        'topics': topics,
+        'pages': pages,
+        'upload_rows': args.upload_rows,
+        'uploads': 0,
+        # Keeps bulk upload topics unique when a database is reused
+        'run': datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    }
+    results = {
+        'meta': {
+            'scale': args.scale,
+            'seed': args.seed,
+            'dialect': dialect,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'started_at': datetime.utcnow().isoformat()
+        },
+        'scenarios': {}
+    }
+    for name in names:
+        print(f"Running {name}...")
+        results['scenarios'][name] = run_scenario(ctx, SCENARIOS[name], args.requests, args.warmup)
+    return results, args
+
+
+if __name__ == '__main__':
+    main()
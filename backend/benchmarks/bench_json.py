@@ -0,0 +1,122 @@
+"""Benchmark JSON serialisation of typical API payloads.
+
+Usage:
+    python benchmarks/bench_json.py [--rows 1000] [--repeat 5]
+
+Serialises a question list (``GET /api/quiz/questions``), a wiki listing
+(``GET /api/wiki?fields=...``) and full wiki pages (``GET /api/wiki``)
+through each JSON provider, building the payload with the models' own
+``to_dict`` as the views do. ``flask-default`` is Flask's stock provider fed
+pre-formatted datetimes, which is how the views worked before
+``app.services.json_provider``. The outputs of every provider are checked to
+decode to the same data before timing.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models.models import Question, WikiPage
+from app.services.json_provider import OrjsonProvider, StdlibProvider, orjson
+
+
+def make_questions(rows):
+    return [
+        Question(
+            id=i, topic_id=1 + i % 10,
+            question_text=f"Which command lists running containers? Variant {i} ünïcode",
+            options=['docker ps', 'docker ls', 'docker list', 'docker show'],
+            correct_answer=0
+        )
+        for i in range(rows)
+    ]
+
+
+def make_pages(rows):
+    start = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    content = "# Heading\n\nSome *markdown* text about Kubernetes. " * 40
+    return [
+        WikiPage(
+            id=i, title=f"Page {i}", slug=f"page-{i}", content=content,
+            category=['docker', 'kubernetes', 'aws'][i % 3],
+            created_at=start + timedelta(minutes=i), updated_at=start + timedelta(minutes=i, seconds=7)
+        )
+        for i in range(rows)
+    ]
+
+
+def legacy(value):
+    """Payload as built before datetimes were serialised natively."""
+    if isinstance(value, list):
+        return [legacy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: legacy(item) for key, item in value.items()}
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def payloads(rows):
+    questions = make_questions(rows)
+    pages = make_pages(rows)
+    return {
+        'question list': lambda: [q.to_dict(shuffle=False) for q in questions],
+        'wiki listing': lambda: {
+            'pages': [{'slug': p.slug, 'title': p.title, 'updated_at': p.updated_at} for p in pages],
+            'next_cursor': None
+        },
+        'wiki pages': lambda: [p.to_dict() for p in pages],
+    }
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON providers")
+    parser.add_argument('--rows', type=int, default=1000, help="rows per payload")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {
+        'flask-default': (DefaultJSONProvider(app), legacy),
+        'stdlib': (StdlibProvider(app), lambda value: value),
+    }
+    if orjson is not None:
+        providers['orjson'] = (OrjsonProvider(app), lambda value: value)
+    else:
+        print("orjson is not installed, skipping it")
+
+    print(f"{'payload':<15}{'provider':<15}{'bytes':>10}{'ms':>10}{'speedup':>10}")
+    with app.app_context():
+        for name, build in payloads(args.rows).items():
+            decoded = None
+            baseline = None
+            for provider_name, (provider, shape) in providers.items():
+                body = provider.response(shape(build())).get_data()
+                data = provider.loads(body)
+                if decoded is not None and data != decoded:
+                    raise SystemExit(f"{provider_name} output differs for {name}")
+                decoded = data
+
+                elapsed = best_of(args.repeat, lambda: provider.response(shape(build())))
+                baseline = baseline or elapsed
+                print(f"{name:<15}{provider_name:<15}{len(body):>10}{elapsed * 1000:>10.2f}"
+                      f"{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Check and benchmark the Core read path against the ORM.
+
+Usage:
+    python benchmarks/bench_reads.py [--scale tiny] [--database-url URL] [--repeat 20]
+    python benchmarks/bench_reads.py --check
+
+Builds each read payload twice, once from ORM objects with the models'
+``to_dict`` (as the views did before ``app.services.reads``) and once with
+the Core statements the views now use, and exits non-zero if any payload
+differs. Shuffled questions are compared under the same random seed. It then
+reports the best time of each path. Without ``--database-url`` a temporary
+SQLite file is filled with the ``benchmarks/synthetic.py`` dataset.
+
+``--check`` only runs the comparison, without timings; CI runs it on every
+backend change (``.github/workflows/backend-checks.yaml``).
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade
+from sqlalchemy import func, select
+
+from synthetic import DEFAULT_SEED, SCALES, make_app, populate
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def payloads(session):
+    """(name, ORM build, Core build) for each read the views serve."""
+    from app.models.models import Question, Topic, WikiPage
+    from app.services import reads
+
+    category = session.execute(select(WikiPage.category).limit(1)).scalar()
+    slug = session.execute(select(WikiPage.slug).limit(1)).scalar()
+    ids = session.execute(select(Question.id).order_by(Question.id.desc()).limit(15)).scalars().all()
+
+    def orm_questions():
+        by_id = {q.id: q for q in Question.query.filter(Question.id.in_(ids)).all()}
+        return [by_id[qid].to_dict() for qid in ids]
+
+    return [
+        ('topics',
+         lambda: [topic.to_dict() for topic in Topic.query.all()],
+         reads.read_topics),
+        ('all questions',
+         lambda: [q.to_dict(shuffle=False) for q in Question.query.all()],
+         reads.read_all_questions),
+        ('quiz questions',
+         orm_questions,
+         lambda: [reads.question_dict(row) for row in reads.read_questions(ids)]),
+        ('wiki pages',
+         lambda: [page.to_dict() for page in WikiPage.query.all()],
+         reads.read_wiki_pages),
+        ('wiki category',
+         lambda: [page.to_dict() for page in WikiPage.query.filter_by(category=category).all()],
+         lambda: reads.read_wiki_pages(category)),
+        ('wiki page',
+         lambda: WikiPage.query.filter_by(slug=slug).first().to_dict(),
+         lambda: reads.page_dict(reads.read_wiki_page(slug))),
+    ]
+
+
+def seeded(build, seed):
+    random.seed(seed)
+    return build()
+
+
+def best_of(repeat, session, build):
+    timings = []
+    for _ in range(repeat):
+        # Start from an empty identity map, as a request does
+        session.expunge_all()
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the Core read path")
+    parser.add_argument('--scale', choices=SCALES, default='tiny')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help="database to read (default: a temporary SQLite file)")
+    parser.add_argument('--repeat', type=int, default=20, help="runs per measurement (best is reported)")
+    parser.add_argument('--check', action='store_true', help="only check the payloads match, without timings")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+
+    from app.models import db, Topic
+
+    # The app prints progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        app = make_app(database_url)
+    with app.app_context():
+        with contextlib.redirect_stdout(sys.stderr):
+            upgrade(directory=MIGRATIONS)
+            if not db.session.execute(select(func.count()).select_from(Topic.__table__)).scalar():
+                populate(db.session, args.scale, args.seed)
+
+        mismatches = []
+        if not args.check:
+            print(f"{'payload':<16}{'rows':>8}{'orm ms':>10}{'core ms':>10}{'speedup':>10}")
+        for name, orm_build, core_build in payloads(db.session):
+            expected = seeded(orm_build, args.seed)
+            actual = seeded(core_build, args.seed)
+            if actual != expected:
+                mismatches.append(name)
+                continue
+            if args.check:
+                print(f"{name}: ok")
+                continue
+            orm_time = best_of(args.repeat, db.session, orm_build)
+            core_time = best_of(args.repeat, db.session, core_build)
+            rows = len(expected) if isinstance(expected, list) else 1
+            print(f"{name:<16}{rows:>8}{orm_time * 1000:>10.2f}{core_time * 1000:>10.2f}"
+                  f"{orm_time / core_time:>9.1f}x")
+
+    if mismatches:
+        print(f"Core output differs from the ORM for: {', '.join(mismatches)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
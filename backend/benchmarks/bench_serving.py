@@ -0,0 +1,201 @@
+"""Compare the sync (WSGI) and async (ASGI) serving modes under concurrency.
+
+Usage:
+    python benchmarks/bench_serving.py [--scale small] [--database-url URL]
+                                       [--workers 2] [--concurrency 1,10,50]
+                                       [--requests 500] [--output results.json]
+
+Starts the app with gunicorn (``gunicorn.conf.py``) and the same number of
+workers in each mode: sync workers serving ``run:app``, threaded workers
+(``GUNICORN_THREADS``) serving ``run:app`` as the Dockerfile does, and
+uvicorn workers serving ``asgi:app``. For every concurrency level, that many client threads
+then send ``--requests`` requests in total to each read scenario over
+keep-alive connections, and throughput, latency percentiles and errors are
+reported for each mode.
+
+Without ``--database-url`` a temporary SQLite file is used, which shows the
+overhead of each mode but hides what async serving is for; point it at
+Postgres (ideally on another host) to see the effect of database round trips.
+The database is migrated and filled with the ``benchmarks/synthetic.py``
+dataset if it is empty.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from flask_migrate import upgrade
+from sqlalchemy import func, select
+
+from synthetic import DEFAULT_SEED, SCALES, make_app, populate, topic_row
+
+MIGRATIONS = os.path.join(BACKEND, 'migrations')
+
+# gunicorn.conf.py is loaded in every mode; the flags override its worker class
+MODES = {
+    'sync': ['-k', 'sync', 'run:app'],
+    'gthread': ['-k', 'gthread', 'run:app'],
+    'async': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app'],
+}
+
+
+def scenarios(topics, pages):
+    return {
+        'topics': lambda rng: '/api/topics',
+        'quiz': lambda rng: f"/api/quiz/{topic_row(rng.randrange(topics))['slug']}",
+        'wiki_page': lambda rng: f'/api/wiki/page-{rng.randrange(pages):06d}',
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(mode, workers, database_url):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.pop('DATABASE_URL_READ', None)
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'] + MODES[mode]
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{mode} server did not start")
+                time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(port, path_for, concurrency, requests, seed):
+    """Send ``requests`` GETs from ``concurrency`` threads; returns the stats."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def client(index):
+        rng = random.Random(f'{seed}:{index}')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        mine = []
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path_for(rng))
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'requests': requests,
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the serving modes")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help="database to serve (default: a temporary SQLite file)")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers in both modes")
+    parser.add_argument('--concurrency', default='1,10,50', help="comma-separated client concurrency levels")
+    parser.add_argument('--requests', type=int, default=500, help="requests per scenario and level")
+    parser.add_argument('--modes', default=','.join(MODES), help="comma-separated modes to run")
+    parser.add_argument('--output', help="also write the results here as JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+
+    from app.models import db, Topic, WikiPage
+
+    # The app prints progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        app = make_app(database_url)
+        with app.app_context():
+            upgrade(directory=MIGRATIONS)
+            if not db.session.execute(select(func.count()).select_from(Topic.__table__)).scalar():
+                populate(db.session, args.scale, args.seed)
+            topics = db.session.query(func.count(Topic.id)).filter(Topic.slug.like('topic-%')).scalar()
+            pages = db.session.query(func.count(WikiPage.id)).filter(WikiPage.slug.like('page-%')).scalar()
+            db.session.remove()
+
+    results = {'meta': {'scale': args.scale, 'workers': args.workers, 'database': database_url.split(':')[0]}}
+    print(f"{'mode':<9}{'scenario':<11}{'conc':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for mode in modes:
+        results[mode] = {}
+        with serve(mode, args.workers, database_url) as port:
+            for name, path_for in scenarios(topics, pages).items():
+                # Warm up every worker's caches and connections
+                run_load(port, path_for, args.workers * 4, args.workers * 20, args.seed)
+                for level in levels:
+                    stats = run_load(port, path_for, level, args.requests, args.seed)
+                    results[mode].setdefault(name, {})[str(level)] = stats
+                    latency = ''.join(f"{str(stats[key]):>9}" for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                    print(f"{mode:<9}{name:<11}{level:>5}{stats['throughput_rps']:>9}{latency}{stats['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
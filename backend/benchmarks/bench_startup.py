@@ -0,0 +1,172 @@
+"""Measure cold starts: how soon a new server answers and how fast at first.
+
+Usage:
+    python benchmarks/bench_startup.py [--scale small] [--database-url URL]
+                                       [--profiles bare,no-warmup,profile] [--runs 3]
+
+Each profile starts gunicorn the way a new pod would after an HPA scale-out,
+then reports:
+
+- ``ready_s``: from process start until the first ``GET /api/topics`` is
+  answered;
+- ``first_*_ms``: latency of the first requests, each to a quiz for a topic
+  (or a wiki page) this server has not served yet, the path a freshly
+  scaled pod takes;
+- ``warm_p50_ms``: the same requests once every topic has been served.
+
+Profiles: ``bare`` is the old ``gunicorn --bind 0.0.0.0:8000 run:app`` (one
+sync worker, nothing preloaded), ``no-warmup`` is ``gunicorn.conf.py`` with
+``APP_WARM_UP=0`` and ``profile`` is ``gunicorn.conf.py`` as shipped. The
+server's own ``app_startup_seconds`` and ``app_warmup_seconds`` metrics are
+shown when it exports them.
+"""
+import argparse
+import contextlib
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from flask_migrate import upgrade
+from sqlalchemy import func, select
+
+from synthetic import DEFAULT_SEED, SCALES, make_app, populate, topic_row
+
+MIGRATIONS = os.path.join(BACKEND, 'migrations')
+
+PROFILES = {
+    'bare': (['--config', os.devnull], {}),
+    'no-warmup': (['--config', 'gunicorn.conf.py'], {'APP_WARM_UP': '0'}),
+    'profile': (['--config', 'gunicorn.conf.py'], {}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def timed_get(port, path):
+    started = time.perf_counter()
+    status, _ = get(port, path)
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return (time.perf_counter() - started) * 1000
+
+
+def scraped(port, name):
+    try:
+        status, body = get(port, '/metrics')
+    except OSError:
+        return None
+    for line in body.decode().splitlines():
+        if line.startswith(name + ' '):
+            return round(float(line.split()[1]), 3)
+    return None
+
+
+def start(profile, database_url, workers):
+    args, extra_env = PROFILES[profile]
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, **extra_env)
+    env.pop('DATABASE_URL_READ', None)
+    env.setdefault('GUNICORN_WORKERS', str(workers))
+    env['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='bench-prom-')
+    command = [sys.executable, '-m', 'gunicorn', *args, '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'run:app']
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            if get(port, '/api/topics')[0] == 200:
+                return process, port, time.perf_counter() - started
+        except OSError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"{profile} server did not start")
+        time.sleep(0.01)
+
+
+def measure(profile, database_url, workers, topics, pages, first, seed):
+    process, port, ready = start(profile, database_url, workers)
+    try:
+        rng = random.Random(seed)
+        paths = [f"/api/quiz/{topic_row(index)['slug']}" for index in rng.sample(range(topics), min(first, topics))]
+        paths += [f'/api/wiki/page-{index:06d}' for index in rng.sample(range(pages), min(first, pages))]
+        cold = sorted(timed_get(port, path) for path in paths)
+        warm = sorted(timed_get(port, path) for path in paths)
+        return {
+            'ready_s': round(ready, 3),
+            'first_p50_ms': round(cold[len(cold) // 2], 2),
+            'first_max_ms': round(cold[-1], 2),
+            'warm_p50_ms': round(warm[len(warm) // 2], 2),
+            'startup_metric_s': scraped(port, 'app_startup_seconds'),
+            'warmup_metric_s': scraped(port, 'app_warmup_seconds'),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold starts")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help="database to serve (default: a temporary SQLite file)")
+    parser.add_argument('--profiles', default=','.join(PROFILES), help="comma-separated profiles to run")
+    parser.add_argument('--workers', type=int, default=2, help="GUNICORN_WORKERS for gunicorn.conf.py profiles")
+    parser.add_argument('--first', type=int, default=20, help="cold quiz and wiki requests per run")
+    parser.add_argument('--runs', type=int, default=3, help="starts per profile (the median run is reported)")
+    args = parser.parse_args()
+
+    profiles = [profile.strip() for profile in args.profiles.split(',') if profile.strip()]
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+
+    from app.models import db, Topic, WikiPage
+
+    # The app prints progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        app = make_app(database_url)
+        with app.app_context():
+            upgrade(directory=MIGRATIONS)
+            if not db.session.execute(select(func.count()).select_from(Topic.__table__)).scalar():
+                populate(db.session, args.scale, args.seed)
+            topics = db.session.query(func.count(Topic.id)).filter(Topic.slug.like('topic-%')).scalar()
+            pages = db.session.query(func.count(WikiPage.id)).filter(WikiPage.slug.like('page-%')).scalar()
+            db.session.remove()
+
+    columns = ('ready_s', 'first_p50_ms', 'first_max_ms', 'warm_p50_ms', 'startup_metric_s', 'warmup_metric_s')
+    print(f"{'profile':<11}" + ''.join(f"{column:>18}" for column in columns))
+    for profile in profiles:
+        runs = sorted(
+            (measure(profile, database_url, args.workers, topics, pages, args.first, args.seed + run)
+             for run in range(args.runs)),
+            key=lambda result: result['ready_s']
+        )
+        result = runs[len(runs) // 2]
+        print(f"{profile:<11}" + ''.join(f"{str(result[column]):>18}" for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Deterministic synthetic datasets for benchmarks.
+
+Usage:
+    python benchmarks/synthetic.py --scale small [--seed 1729] [--database-url URL]
+    python benchmarks/synthetic.py --scale small --csv-dir /tmp/questions
+
+The same scale and seed always produce the same topics, questions and wiki
+pages. Rows follow the ``Topic``/``Question``/``WikiPage`` schemas, including
+the derived columns (content hashes and LSH buckets, rendered HTML, section
+indexes) that the app maintains on write, so reads behave as on real data.
+``--csv-dir`` writes the questions in the ``questions-answers/*.csv`` layout
+instead, one file per topic, ready for ``bulk_upload_questions.py``.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+
+from app.models.models import Question, Topic, WikiPage
+from app.services.bulk_ingest import CSV_FIELDS
+from app.services.duplicates import index_questions
+from app.services.fingerprints import content_hash
+from app.services.versions import bump_version
+from app.services.wiki_render import content_digest, render_markdown
+from app.services.wiki_sections import build_sections
+
+# name: (topics, questions, wiki pages)
+SCALES = {
+    'tiny': (10, 1_000, 10),
+    'small': (100, 10_000, 1_000),
+    'medium': (1_000, 100_000, 10_000),
+    'large': (10_000, 1_000_000, 100_000),
+}
+DEFAULT_SEED = 1729
+INSERT_CHUNK = 5000
+EPOCH = datetime(2024, 1, 1)
+
+_WORDS = (
+    'container image pod node cluster service deployment volume network ingress '
+    'pipeline build artifact registry secret config replica scaling load balancer '
+    'terraform module state provider bucket instance subnet route gateway policy '
+    'role trigger job stage agent branch merge commit tag release rollback probe '
+    'namespace daemon kernel process socket port firewall certificate token cache'
+).split()
+_STEMS = (
+    'Which command is used to', 'What is the purpose of', 'How do you',
+    'Which component is responsible for', 'What happens when you', 'Why would you'
+)
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def topic_row(index):
+    return {
+        'id': index + 1,
+        'name': f"Topic {index:05d}",
+        'slug': f"topic-{index:05d}",
+        'description': f"Synthetic topic {index}",
+        'created_at': EPOCH + timedelta(minutes=index)
+    }
+
+
+def question_row(rng, index, topics):
+    options = [_sentence(rng, 3) + f" {index}-{n}" for n in range(4)]
+    return {
+        'id': index + 1,
+        'topic_id': index % topics + 1,
+        # The index keeps every question distinct, so none is a duplicate
+        'question_text': f"{rng.choice(_STEMS)} {_sentence(rng, 6)}? (#{index})",
+        'options': options,
+        'correct_answer': rng.randrange(4),
+        'created_at': EPOCH + timedelta(seconds=index)
+    }
+
+
+def page_content(rng, index):
+    parts = [f"Introduction to synthetic page {index}. {_sentence(rng, 30)}.\n"]
+    for section in range(rng.randint(2, 6)):
+        parts.append(f"\n## {_sentence(rng, 2).title()} {section}\n\n{_sentence(rng, 60)}.\n")
+        if rng.random() < 0.5:
+            parts.append(f"\n### Example\n\n```bash\nkubectl get {rng.choice(_WORDS)}\n```\n")
+    return ''.join(parts)
+
+
+def page_row(rng, index, categories):
+    content = page_content(rng, index)
+    rendered = render_markdown(content)
+    updated_at = EPOCH + timedelta(minutes=index, seconds=rng.randrange(3600))
+    return {
+        'id': index + 1,
+        'title': f"Page {index:06d}",
+        'slug': f"page-{index:06d}",
+        'content': content,
+        'category': f"category-{index % categories}",
+        'author': 'benchmark',
+        'is_published': True,
+        'created_at': EPOCH + timedelta(minutes=index),
+        'updated_at': updated_at,
+        'content_html': rendered['html'],
+        'toc': rendered['toc'],
+        'rendered_hash': content_digest(content),
+        'sections': build_sections(content)
+    }
+
+
+def csv_rows(rng, topic_slug, count, start=0):
+    """Question rows in the ``questions-answers`` CSV layout."""
+    for index in range(start, start + count):
+        options = [_sentence(rng, 3) + f" {index}-{n}" for n in range(4)]
+        yield {
+            'topic_slug': topic_slug,
+            'question_text': f"{rng.choice(_STEMS)} {_sentence(rng, 6)}? (#{topic_slug}-{index})",
+            'option1': options[0], 'option2': options[1], 'option3': options[2], 'option4': options[3],
+            'correct_answer': rng.randrange(4)
+        }
+
+
+def csv_text(topic_slug, count, seed=DEFAULT_SEED, start=0):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(csv_rows(random.Random(f"{seed}:{topic_slug}:{start}"), topic_slug, count, start))
+    return buffer.getvalue()
+
+
+def _insert(session, table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        session.execute(table.insert(), rows[start:start + INSERT_CHUNK])
+
+
+def populate(session, scale, seed=DEFAULT_SEED, log=print):
+    """Fill an empty, migrated database with the dataset for ``scale``."""
+    topics, questions, pages = SCALES[scale]
+    if session.execute(select(func.count()).select_from(Topic.__table__)).scalar():
+        raise ValueError("Database already contains topics; populate an empty one")
+
+    started = time.monotonic()
+    _insert(session, Topic.__table__, [topic_row(i) for i in range(topics)])
+
+    rng = random.Random(f"{seed}:questions")
+    for start in range(0, questions, INSERT_CHUNK):
+        rows = [question_row(rng, i, topics) for i in range(start, min(start + INSERT_CHUNK, questions))]
+        for row in rows:
+            row['content_hash'] = content_hash(row['question_text'])
+        _insert(session, Question.__table__, rows)
+        index_questions(session, [(row['id'], row['topic_id'], row['question_text']) for row in rows])
+        log(f"  questions: {start + len(rows)}/{questions}")
+
+    rng = random.Random(f"{seed}:wiki")
+    categories = max(1, pages // 100)
+    for start in range(0, pages, INSERT_CHUNK):
+        rows = [page_row(rng, i, categories) for i in range(start, min(start + INSERT_CHUNK, pages))]
+        _insert(session, WikiPage.__table__, rows)
+        log(f"  wiki pages: {start + len(rows)}/{pages}")
+
+    if session.get_bind().dialect.name == 'postgresql':
+        # Rows were inserted with explicit IDs; move the sequences past them
+        for table in ('topics', 'questions', 'wiki_pages'):
+            session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+            ))
+    for name in ('topics', 'questions', 'wiki_pages'):
+        bump_version(session, name)
+    session.commit()
+    log(f"Generated {scale}: {topics} topics, {questions} questions, {pages} wiki pages "
+        f"in {time.monotonic() - started:.1f}s")
+
+
+def make_app(database_url=None):
+    """The app, pointed at ``database_url`` when given (no replicas)."""
+    from app import create_app
+    from app.config import Config, engine_options
+
+    if not database_url:
+        return create_app()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(database_url)
+        SQLALCHEMY_BINDS = {}
+        # Derived from database_url by the ASGI app, whatever ASYNC_DATABASE_URL says
+        ASYNC_DATABASE_URI = None
+
+    return create_app(BenchmarkConfig)
+
+
+def write_csv_files(directory, scale, seed=DEFAULT_SEED):
+    topics, questions, _ = SCALES[scale]
+    os.makedirs(directory, exist_ok=True)
+    per_topic, extra = divmod(questions, topics)
+    for index in range(topics):
+        slug = topic_row(index)['slug']
+        with open(os.path.join(directory, f"{slug}.csv"), 'w', newline='') as file:
+            file.write(csv_text(slug, per_topic + (index < extra), seed))
+    print(f"Wrote {topics} CSV files with {questions} questions to {directory}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument('--scale', choices=SCALES, default='tiny')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database-url', help="database to fill (default: DATABASE_URL); must be migrated and empty")
+    parser.add_argument('--csv-dir', help="write questions-answers CSV files here instead of filling a database")
+    args = parser.parse_args()
+
+    if args.csv_dir:
+        write_csv_files(args.csv_dir, args.scale, args.seed)
+    else:
+        from app.models import db
+
+        app = make_app(args.database_url)
+        with app.app_context():
+            populate(db.session, args.scale, args.seed)
@@ -1,112 +1,215 @@
+"""Load quiz questions from CSV files into the database.
+
+Usage:
+    python bulk_upload_questions.py [options] <csv file or directory> [...]
+
+Files use the questions-answers/*.csv layout
+(topic_slug,question_text,option1..option4,correct_answer). Directories are
+searched for *.csv files, skipping *_template.csv.
+
+Topics for every file are resolved up front in one pass, then each file is
+cut into fixed-size chunks that a pool of worker processes writes in
+parallel (COPY FROM STDIN on Postgres, executemany elsewhere). Each chunk is
+recorded in the ingest_checkpoints table in the same transaction as its
+rows, so an interrupted load can simply be re-run: chunks that already
+committed are skipped and no row is inserted twice. Re-running with a
+different --chunk-size starts the file over.
+"""
+import argparse
 import csv
-from app import create_app
-from app.models import db, Topic, Question
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
 from sqlalchemy.exc import IntegrityError
 
-def bulk_upload_questions(csv_file_path, batch_size=100):
+from app import create_app
+from app.models import db, IngestCheckpoint
+from app.services.bulk_ingest import QuestionIngest, question_from_csv_row, resolve_topics
+from app.services.question_index import track_changes
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_BATCH_SIZE = 1000
+MAX_ERRORS_SHOWN = 5
+
+
+def find_csv_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith('.csv') and not name.endswith('_template.csv')
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def file_source(path, chunk_size):
+    """Checkpoint key for a file: its content hash plus the chunk size."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return f"{digest.hexdigest()}:{chunk_size}"
+
+
+def read_chunks(path, chunk_size):
+    """Yield ``(chunk_index, rows)`` where rows are ``(row_number, row)`` pairs."""
+    with open(path, 'r', newline='') as file:
+        chunk = []
+        for row_number, row in enumerate(csv.DictReader(file), start=1):
+            chunk.append((row_number, row))
+            if len(chunk) == chunk_size:
+                yield (row_number - 1) // chunk_size, chunk
+                chunk = []
+        if chunk:
+            yield (chunk[0][0] - 1) // chunk_size, chunk
+
+
+def collect_topic_slugs(files):
+    slugs = set()
+    for path in files:
+        with open(path, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                slug = (row.get('topic_slug') or '').strip()
+                if slug:
+                    slugs.add(slug)
+    return slugs
+
+
+_worker = {}
+
+
+def init_worker(topic_ids, batch_size):
+    # Every worker process gets its own app, engine and connection pool
+    _worker['app'] = create_app()
+    _worker['topic_ids'] = topic_ids
+    _worker['batch_size'] = batch_size
+
+
+def load_chunk(path, source, chunk, rows):
+    """Write one chunk and its checkpoint in a single transaction."""
+    result = {'path': path, 'chunk': chunk, 'rows': len(rows), 'success': 0,
+              'failed': 0, 'skipped': 0, 'errors': []}
+
+    with _worker['app'].app_context():
+        config = _worker['app'].config
+        ingest = QuestionIngest(
+            db.session, batch_size=_worker['batch_size'], use_copy=True,
+            duplicate_policy=config['DUPLICATE_QUESTION_POLICY'],
+            near_threshold=config['NEAR_DUPLICATE_THRESHOLD']
+        )
+        ingest.preload_topics(_worker['topic_ids'])
+        for row_number, row in rows:
+            ingest.add(row_number, question_from_csv_row(row))
+
+        try:
+            ingest.flush()
+            db.session.add(IngestCheckpoint(source=source, chunk=chunk, rows=len(rows)))
+            db.session.commit()
+            result.update(success=ingest.success, failed=ingest.failed, errors=ingest.errors)
+        except IntegrityError as e:
+            db.session.rollback()
+            if db.session.get(IngestCheckpoint, (source, chunk)) is not None:
+                # Another run already committed this chunk
+                result['skipped'] = len(rows)
+            else:
+                result['failed'] = len(rows)
+                result['errors'] = [f"Rows {rows[0][0]}-{rows[-1][0]}: {str(e)}"]
+        except Exception as e:
+            db.session.rollback()
+            result['failed'] = len(rows)
+            result['errors'] = [f"Rows {rows[0][0]}-{rows[-1][0]}: {str(e)}"]
+        finally:
+            db.session.remove()
+
+    return result
+
+
+def bulk_upload_questions(paths, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+    workers = workers or os.cpu_count() or 1
+    files = find_csv_files(paths)
+    if not files:
+        print("No CSV files found")
+        return
+
     app = create_app()
-    
+    sources = [(path, file_source(path, chunk_size)) for path in files]
+
     with app.app_context():
-        with open(csv_file_path, 'r') as file:
-            csv_reader = csv.DictReader(file)
-            questions_batch = []
-            total_processed = 0
-            total_success = 0
-            total_failed = 0
-            topics_created = 0
-            
-            for row in csv_reader:
-                try:
-                    topic_slug = row['topic_slug'].strip()
-                    
-                    # Find or create the topic
-                    topic = Topic.query.filter_by(slug=topic_slug).first()
-                    if not topic:
-                        # Create a new topic with default values based on slug
-                        topic_name = topic_slug.replace('-', ' ').title()
-                        topic = Topic(
-                            name=topic_name,
-                            description=f"Questions about {topic_name}",
-                            slug=topic_slug
-                        )
-                        db.session.add(topic)
-                        db.session.commit()  # Commit immediately to get the ID
-                        topics_created += 1
-                        print(f"Created new topic: {topic_name} ({topic_slug})")
-                    
-                    # Parse options from CSV format
-                    options = []
-                    for i in range(1, 5):
-                        option_key = f'option{i}'
-                        if option_key in row and row[option_key]:
-                            options.append(row[option_key])
-                    
-                    # If CSV has a single options column instead of option1, option2, etc.
-                    if 'options' in row and not options:
-                        # Try to parse options as a list
-                        try:
-                            import json
-                            options = json.loads(row['options'])
-                        except:
-                            # Fallback: assume comma-separated values
-                            options = [opt.strip() for opt in row['options'].split(',')]
-                    
-                    # Validate options
-                    if len(options) != 4:
-                        print(f"Error: Question must have exactly 4 options (row has {len(options)})")
-                        total_failed += 1
-                        continue
-                    
-                    # Create question object
-                    question = Question(
-                        topic_id=topic.id,
-                        question_text=row['question_text'],
-                        options=options,
-                        correct_answer=int(row['correct_answer'])
-                    )
-                    
-                    questions_batch.append(question)
-                    total_processed += 1
-                    
-                    # Commit in batches
-                    if len(questions_batch) >= batch_size:
-                        try:
-                            db.session.bulk_save_objects(questions_batch)
-                            db.session.commit()
-                            total_success += len(questions_batch)
-                            print(f"Committed batch of {len(questions_batch)} questions")
-                            questions_batch = []
-                        except IntegrityError as e:
-                            db.session.rollback()
-                            print(f"Error in batch: {str(e)}")
-                            total_failed += len(questions_batch)
-                            questions_batch = []
-                
-                except Exception as e:
-                    print(f"Error processing row: {str(e)}")
-                    total_failed += 1
-            
-            # Commit any remaining questions
-            if questions_batch:
-                try:
-                    db.session.bulk_save_objects(questions_batch)
-                    db.session.commit()
-                    total_success += len(questions_batch)
-                except IntegrityError as e:
-                    db.session.rollback()
-                    print(f"Error in final batch: {str(e)}")
-                    total_failed += len(questions_batch)
-            
-            print(f"\nUpload Summary:")
-            print(f"Total Processed: {total_processed}")
-            print(f"Successfully Uploaded: {total_success}")
-            print(f"Failed: {total_failed}")
-            print(f"Topics Created: {topics_created}")
+        # Resolve every topic once so workers never look topics up
+        topic_ids, created = resolve_topics(db.session, collect_topic_slugs(files))
+        track_changes(db.session, topics=created.values())
+        db.session.commit()
+        for slug in sorted(created):
+            print(f"Created new topic: {slug}")
+
+        done = set(db.session.query(IngestCheckpoint.source, IngestCheckpoint.chunk).filter(
+            IngestCheckpoint.source.in_([source for _, source in sources])
+        ))
+        # Don't hand pooled connections over to forked workers
+        db.engine.dispose()
+
+    totals = {'rows': 0, 'success': 0, 'failed': 0, 'skipped': 0}
+    started = time.monotonic()
+
+    def report(result):
+        for key in totals:
+            totals[key] += result[key]
+        rate = totals['success'] / max(time.monotonic() - started, 1e-9)
+        print(f"{result['path']} chunk {result['chunk']}: {result['success']} loaded, "
+              f"{result['failed']} failed, {result['skipped']} skipped ({rate:.0f} rows/sec)")
+        for error in result['errors'][:MAX_ERRORS_SHOWN]:
+            print(f"  {error}")
+
+    def tasks():
+        for path, source in sources:
+            for chunk, rows in read_chunks(path, chunk_size):
+                if (source, chunk) in done:
+                    totals['rows'] += len(rows)
+                    totals['skipped'] += len(rows)
+                    continue
+                yield path, source, chunk, rows
+
+    if workers == 1:
+        init_worker(topic_ids, batch_size)
+        for task in tasks():
+            report(load_chunk(*task))
+    else:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(topic_ids, batch_size)) as pool:
+            # Keep a bounded number of chunks in flight so memory stays flat
+            in_flight = set()
+            for task in tasks():
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future.result())
+                in_flight.add(pool.submit(load_chunk, *task))
+            for future in in_flight:
+                report(future.result())
+
+    elapsed = time.monotonic() - started
+    print(f"\nUpload Summary:")
+    print(f"Files: {len(files)}")
+    print(f"Total Processed: {totals['rows']}")
+    print(f"Successfully Uploaded: {totals['success']}")
+    print(f"Failed: {totals['failed']}")
+    print(f"Skipped (already loaded): {totals['skipped']}")
+    print(f"Topics Created: {len(created)}")
+    print(f"Elapsed: {elapsed:.1f}s ({totals['success'] / max(elapsed, 1e-9):.0f} rows/sec)")
+
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python bulk_upload_questions.py <csv_file_path>")
-        sys.exit(1)
-    
-    bulk_upload_questions(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load quiz questions from CSV files")
+    parser.add_argument('paths', nargs='+', help="CSV files or directories of CSV files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per checkpointed chunk")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="rows per INSERT batch")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1 or args.batch_size < 1:
+        parser.error("--chunk-size and --batch-size must be positive")
+    bulk_upload_questions(args.paths, workers=args.workers, chunk_size=args.chunk_size, batch_size=args.batch_size)
@@ -0,0 +1,135 @@
+"""Production serving profile, loaded by ``gunicorn -c gunicorn.conf.py run:app``.
+
+Workers and threads are sized from the container's CPU and memory limits
+(cgroup v2 or v1, falling back to the host) unless GUNICORN_WORKERS and
+GUNICORN_THREADS are set. The app is loaded and warmed once in the master
+(``services/warmup.py``) before any worker is forked, so new pods, and
+workers replacing dead ones, serve their first request hot. The port is
+bound but not answered until then, which keeps the pod out of the Service
+while it warms up.
+"""
+import math
+import os
+import shutil
+import time
+
+_started = time.monotonic()
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """CPUs this container may use (may be fractional)."""
+    quota = _read('/sys/fs/cgroup/cpu.max')
+    if quota:
+        limit, period = quota.split()
+        if limit != 'max':
+            return int(limit) / int(period)
+    limit, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if limit and period and int(limit) > 0:
+        return int(limit) / int(period)
+    return os.cpu_count() or 1
+
+
+def memory_limit():
+    """Bytes this container may use, or None when unlimited."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = _read(path)
+        # cgroup v1 reports "unlimited" as a huge number
+        if limit and limit != 'max' and int(limit) < 1 << 60:
+            return int(limit)
+    return None
+
+
+def default_workers():
+    workers = max(2, math.ceil(2 * cpu_limit()) + 1)
+    memory = memory_limit()
+    if memory:
+        # Leave room for the master; each worker needs its own heap
+        per_worker = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '128')) * 1024 * 1024
+        workers = min(workers, max(1, (memory - per_worker) // per_worker))
+    return workers
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '0')) or default_workers()
+# Threads overlap database round trips; keep them within DB_POOL_SIZE + DB_MAX_OVERFLOW
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Longer than the load balancer's idle timeout (60s on an ALB), so it never
+# reuses a connection we just closed
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '65'))
+preload_app = bool(int(os.getenv('GUNICORN_PRELOAD', '1')))
+# Heartbeat files on tmpfs; an overlay /tmp can stall workers into timeouts
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+warm_up_enabled = bool(int(os.getenv('APP_WARM_UP', '1')))
+
+# Workers share their Prometheus samples through this directory; clear out
+# files left by a previous master before any worker starts
+prometheus_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir)
+
+
+def _flask_app(server):
+    app = server.app.wsgi()
+    # asgi:app wraps the Flask app
+    return getattr(app, 'flask_app', app)
+
+
+def when_ready(server):
+    # Runs in the master after binding, before the first worker is forked
+    per_worker = f" x {threads} threads" if worker_class == 'gthread' else ''
+    server.log.info(f"Serving with {workers} {worker_class} workers{per_worker}, preload={preload_app}")
+    if preload_app:
+        from app.services.warmup import dispose_engines, warm_up
+
+        app = _flask_app(server)
+        if warm_up_enabled:
+            warm_up(app)
+        # Workers open their own connections
+        dispose_engines(app)
+
+    from app.services import metrics
+    metrics.STARTUP_DURATION.set(time.monotonic() - _started)
+    server.log.info(f"Ready in {time.monotonic() - _started:.2f}s")
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.services.warmup import dispose_engines
+
+        # Drop the pools inherited from the master without closing its sockets
+        dispose_engines(_flask_app(server), close=False)
+
+
+def post_worker_init(worker):
+    from app.services import metrics
+
+    if not preload_app and warm_up_enabled:
+        from app.services.warmup import warm_up
+
+        app = worker.wsgi
+        warm_up(getattr(app, 'flask_app', app))
+    metrics.WORKER_BOOT_DURATION.observe(time.monotonic() - worker.forked_at)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
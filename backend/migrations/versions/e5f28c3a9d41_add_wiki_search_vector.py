@@ -0,0 +1,40 @@
+"""Add full-text search vector to wiki pages
+
+Revision ID: e5f28c3a9d41
+Revises: d93b5f07e2c1
+Create Date: 2026-10-16 16:38:12.094776
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f28c3a9d41'
+down_revision = 'd93b5f07e2c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("INSERT INTO table_versions (name, version) VALUES ('wiki_pages', 0)")
+
+    # Postgres only; other databases use the in-process search index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("""
+        ALTER TABLE wiki_pages ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED
+    """)
+    op.create_index('ix_wiki_pages_search_vector', 'wiki_pages', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_wiki_pages_search_vector', table_name='wiki_pages')
+        op.drop_column('wiki_pages', 'search_vector')
+
+    op.execute("DELETE FROM table_versions WHERE name = 'wiki_pages'")
@@ -66,7 +66,8 @@ function Quiz() {
         },
         body: JSON.stringify({
           topic: topic,
-          answers: answers
+          answers: answers,
+          token: quiz.token
         })
       });
 
@@ -2,15 +2,28 @@ import API_URL from '../config/api';
 
 export const fetchAllWikiPages = async (category = null) => {
   try {
-    const url = category 
-      ? `${API_URL}/api/wiki?category=${encodeURIComponent(category)}`
-      : `${API_URL}/api/wiki`;
-      
-    const response = await fetch(url);
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
+    // Lightweight listing: no page content, followed page by page via cursor
+    const params = new URLSearchParams({ fields: 'slug,title,category,updated_at', limit: '200' });
+    if (category) {
+      params.set('category', category);
     }
-    return await response.json();
+
+    const pages = [];
+    let cursor = null;
+    do {
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${API_URL}/api/wiki?${params.toString()}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      const data = await response.json();
+      pages.push(...data.pages);
+      cursor = data.next_cursor;
+    } while (cursor);
+
+    return pages;
   } catch (error) {
     console.error('Error fetching wiki pages:', error);
     throw error;
@@ -30,6 +43,21 @@ export const fetchWikiPage = async (slug) => {
   }
 };
 
+export const searchWikiPages = async (query, page = 1) => {
+  try {
+    const response = await fetch(
+      `${API_URL}/api/wiki/search?q=${encodeURIComponent(query)}&page=${page}`
+    );
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error searching wiki pages:', error);
+    throw error;
+  }
+};
+
 export const fetchWikiCategories = async () => {
   try {
     const response = await fetch(`${API_URL}/api/wiki/categories`);
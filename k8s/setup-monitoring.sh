@@ -14,6 +14,11 @@ helm install prometheus prometheus-community/prometheus \
   --set alertmanager.persistentVolume.storageClass="gp2" \
   --set server.persistentVolume.storageClass="gp2"
 
+# Install prometheus-adapter, exposing http_requests_in_flight to the backend HPA
+helm install prometheus-adapter prometheus-community/prometheus-adapter \
+  --namespace monitoring \
+  --values "$(dirname "$0")/prometheus-adapter-values.yaml"
+
 # Install Grafana
 helm install grafana grafana/grafana \
   --namespace monitoring \